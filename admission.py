@@ -0,0 +1,225 @@
+#controle de admissão: limite de requisições (token bucket) e de concorrência
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+# cada bucket: hash da chave (0 = livre), tokens disponiveis, ultima atualização (epoch)
+_SLOT = struct.Struct('<Qdd')
+# slots por grupo: uma chave só ocupa slots do seu grupo, que é a unidade de lock
+_GROUP_SLOTS = 8
+_GROUP_SIZE = _SLOT.size * _GROUP_SLOTS
+
+
+class RateLimited(Exception):
+    """Levantada quando o cliente esgotou o limite de requisições da rota."""
+
+    def __init__(self, retry_after):
+        super().__init__('limite de requisições excedido')
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """Levantada quando o worker já atende o maximo de requisições simultaneas."""
+
+    def __init__(self, retry_after):
+        super().__init__('servidor sobrecarregado')
+        self.retry_after = retry_after
+
+
+class TokenBucketStore:
+    """
+    Token buckets em uma tabela de tamanho fixo mapeada em memoria (mmap).
+    Com 'path' a tabela é um arquivo local compartilhado por todos os workers
+    do servidor (lock de intervalo de bytes por grupo com fcntl); sem 'path'
+    ela vale só para o processo atual.
+
+    Quando o grupo de uma chave nova está cheio o bucket atualizado há mais
+    tempo é reaproveitado (no pior caso um cliente ganha um bucket cheio).
+    """
+
+    def __init__(self, path=None, slots=65536):
+        self.path = path
+        self.groups = max(1, slots // _GROUP_SLOTS)
+        self._lock = threading.Lock()
+        self._map = None
+        self._fd = None
+        self._pid = None
+
+    def _ensure_open(self):
+        # aberto no primeiro uso e reaberto apos um fork (pre-fork)
+        if self._map is not None and self._pid == os.getpid():
+            return
+        size = self.groups * _GROUP_SIZE
+        if self.path:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+            self._fd = fd
+        else:
+            self._map = mmap.mmap(-1, size)
+            self._fd = None
+        self._pid = os.getpid()
+
+    def take(self, key, rate, burst, now=None):
+        """
+        Consome um token do bucket 'key' (reposto a 'rate' tokens/s, até 'burst').
+        Retorna 0 se a requisição foi aceita ou os segundos até o proximo token.
+        """
+        digest = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+        offset = (digest % self.groups) * _GROUP_SIZE
+        with self._lock:
+            self._ensure_open()
+            if self._fd is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, _GROUP_SIZE, offset)
+            try:
+                now = now if now is not None else time.time()
+                slot, tokens, updated = self._find(offset, digest)
+                if slot is None:
+                    slot, tokens = self._victim(offset), burst
+                else:
+                    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0
+                else:
+                    wait = (1 - tokens) / rate
+                _SLOT.pack_into(self._map, slot, digest, tokens, now)
+                return wait
+            finally:
+                if self._fd is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, _GROUP_SIZE, offset)
+
+    def _find(self, offset, digest):
+        for i in range(_GROUP_SLOTS):
+            position = offset + i * _SLOT.size
+            key, tokens, updated = _SLOT.unpack_from(self._map, position)
+            if key == digest:
+                return position, tokens, updated
+        return None, 0.0, 0.0
+
+    def _victim(self, offset):
+        oldest, oldest_updated = offset, None
+        for i in range(_GROUP_SLOTS):
+            position = offset + i * _SLOT.size
+            key, _, updated = _SLOT.unpack_from(self._map, position)
+            if key == 0:
+                return position
+            if oldest_updated is None or updated < oldest_updated:
+                oldest, oldest_updated = position, updated
+        return oldest
+
+
+class AdmissionControl:
+    """
+    Barra requisições antes de a rota rodar (sem tocar no banco nem no bcrypt):
+
+    - limite de concorrência por worker (ADMISSION_MAX_CONCURRENT): acima
+      dele a requisição é descartada na hora com Overloaded (503);
+    - token buckets por rota, por IP e por usuario (identidade do JWT),
+      configurados em RATE_LIMITS: esgotado o limite, RateLimited (429).
+
+    RATE_LIMITS mapeia o endpoint ('api.login') ou 'default' para
+    {'ip': (requisições, segundos), 'user': (requisições, segundos)}.
+    """
+
+    def __init__(self):
+        self.rate_limit_enabled = True
+        self.max_concurrent = 64
+        self.retry_after = 1
+        self.exempt = ()
+        self.limits = {}
+        self.store = TokenBucketStore()
+        self._slots = None
+        self._metrics_lock = threading.Lock()
+        self._rejected = Counter()
+        self._in_flight = 0
+
+    def init_app(self, app):
+        self.rate_limit_enabled = app.config.get('RATE_LIMIT_ENABLED', self.rate_limit_enabled)
+        self.max_concurrent = app.config.get('ADMISSION_MAX_CONCURRENT', self.max_concurrent)
+        self.retry_after = app.config.get('ADMISSION_RETRY_AFTER', self.retry_after)
+        self.exempt = set(app.config.get('ADMISSION_EXEMPT', self.exempt))
+        self.limits = app.config.get('RATE_LIMITS', self.limits)
+        self.store = TokenBucketStore(
+            app.config.get('RATE_LIMIT_STORE_PATH'),
+            app.config.get('RATE_LIMIT_STORE_SLOTS', 65536),
+        )
+        self._slots = threading.BoundedSemaphore(self.max_concurrent) if self.max_concurrent > 0 else None
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in self.exempt:
+            return
+        if self._slots is not None:
+            if not self._slots.acquire(blocking=False):
+                self._reject('shed', endpoint)
+                raise Overloaded(self.retry_after)
+            g.admission_slot = True
+            with self._metrics_lock:
+                self._in_flight += 1
+        if self.rate_limit_enabled:
+            self._check_limits(endpoint)
+
+    def _teardown_request(self, exc=None):
+        if g.pop('admission_slot', False):
+            with self._metrics_lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _check_limits(self, endpoint):
+        limits = self.limits.get(endpoint, self.limits.get('default'))
+        if not limits:
+            return
+        keys = []
+        if 'ip' in limits:
+            keys.append((f'{endpoint}:ip:{request.remote_addr}', limits['ip']))
+        if 'user' in limits:
+            identity = self._identity()
+            if identity is not None:
+                keys.append((f'{endpoint}:user:{identity}', limits['user']))
+        for key, (requests, period) in keys:
+            wait = self.store.take(key, requests / period, requests)
+            if wait:
+                self._reject('rate_limited', endpoint)
+                raise RateLimited(max(1, int(wait + 0.999)))
+
+    def _identity(self):
+        # token ausente ou invalido: a rota decide (401); aqui só vale o limite por IP
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt_identity()
+        except Exception:
+            return None
+
+    def _reject(self, reason, endpoint):
+        with self._metrics_lock:
+            self._rejected[(reason, endpoint)] += 1
+
+    def render_metrics(self):
+        """Linhas no formato do Prometheus para o /metrics."""
+        with self._metrics_lock:
+            rejected = sorted(self._rejected.items())
+            in_flight = self._in_flight
+        lines = [
+            '# HELP admission_rejected_total Requisições recusadas pelo controle de admissão.',
+            '# TYPE admission_rejected_total counter',
+        ]
+        for (reason, endpoint), value in rejected:
+            lines.append(f'admission_rejected_total{{reason="{reason}",endpoint="{endpoint}"}} {value}')
+        lines += [
+            '# HELP admission_in_flight Requisições em andamento neste worker.',
+            '# TYPE admission_in_flight gauge',
+            f'admission_in_flight {in_flight}',
+        ]
+        return lines
@@ -1,23 +1,46 @@
 #app
-from flask import Flask, jsonify, request
+import base64
+import json
+import re
+import sys
+import time
+
+import click
+from flask import Blueprint, Flask, abort, current_app, jsonify, request, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from flasgger import Swagger
+from sqlalchemy import event, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt, jwt_required, get_jwt_identity
 
 #importo config:
 
 from config import Config
+from admission import AdmissionControl, Overloaded, RateLimited
+from blocklist import TokenBlocklist, prune_sync_file
+from cache import ResponseCache
+from engines import RoutingSession, configure_database, install_engine_events
+from hashing import HasherBusy, PasswordHasher
+from ingredients import IngredientIndex, parse_ingredients
+from metrics import Metrics
+from openapi import build_openapi_spec, init_openapi
+from similarity import SimilarityIndex
+from write_batcher import WriteBatcher, WriteQueueFull, WriteTimeout
 
-#cria instancia da aplicação flask e configura com o config
-app = Flask(__name__)
-app.config.from_object(Config)
+#extensões (ligadas à aplicação em create_app)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+password_hasher = PasswordHasher()
+jwt = JWTManager()
+response_cache = ResponseCache()
+metrics = Metrics()
+recipe_batcher = WriteBatcher()
+token_blocklist = TokenBlocklist()
+admission = AdmissionControl()
+#indice LSH das receitas similares (carregado no primeiro uso)
+similarity_index = SimilarityIndex()
 
-#inicia as extensões
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
-jwt = JWTManager(app)
-swagger = Swagger(app)
+#rotas e comandos da API (cli_group=None mantem 'flask create-db' etc. no nivel principal)
+api = Blueprint('api', __name__, cli_group=None)
 
 #----- BANCO DE DADOS ----
 
@@ -35,6 +58,18 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class RevokedToken(db.Model):
+    """
+    Modelo de dados para a tabela de tokens JWT revogados (logout).
+    """
+    __tablename__ = 'revoked_tokens'
+    jti = db.Column(db.String(36), primary_key=True)
+    # expiração do token (epoch em segundos); depois disso a linha pode ser apagada
+    expires_at = db.Column(db.Integer, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
+
 class Recipe(db.Model):
     """
     Modelo de dados para a tabela de receitas.
@@ -42,28 +77,268 @@ class Recipe(db.Model):
     __tablename__ = 'recipes'  # <--- CORREÇÃO: Nome da tabela definido explicitamente
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
-    description = db.Column(db.Text, nullable=False)
-    ingredients = db.Column(db.Text, nullable=False)
-    instructions = db.Column(db.Text, nullable=False)
+    # Colunas de texto grandes são adiadas (deferred): só são carregadas, juntas,
+    # quando algum desses atributos é acessado
+    description = db.deferred(db.Column(db.Text, nullable=False), group='body')
+    ingredients = db.deferred(db.Column(db.Text, nullable=False), group='body')
+    instructions = db.deferred(db.Column(db.Text, nullable=False), group='body')
     # Relação com usuário: uma receita pertence a um usuário
     # <--- CORREÇÃO: Referenciando a tabela 'users'
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Ingredientes normalizados extraidos do texto livre de 'ingredients'
+    ingredient_items = db.relationship('Ingredient', secondary='recipe_ingredients', lazy=True)
+
+    # Indice composto para listar as receitas de um usuario já na ordem do id
+    # (keyset), sem varrer a tabela inteira
+    __table_args__ = (
+        db.Index('ix_recipes_user_id_id', 'user_id', 'id'),
+    )
 
     def __repr__(self):
         return f'<Recipe {self.title}>'
+
+class Ingredient(db.Model):
+    """
+    Modelo de dados para a tabela de ingredientes normalizados.
+    """
+    __tablename__ = 'ingredients'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<Ingredient {self.name}>'
+
+class RecipeSignature(db.Model):
+    """
+    Modelo de dados para a tabela de assinaturas MinHash das receitas
+    (array de inteiros de 32 bits serializado), usada pelo indice de similares.
+    """
+    __tablename__ = 'recipe_signatures'
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f'<RecipeSignature {self.recipe_id}>'
+
+# Tabela de ligação receita <-> ingrediente
+recipe_ingredients = db.Table(
+    'recipe_ingredients',
+    db.Column('recipe_id', db.Integer, db.ForeignKey('recipes.id'), primary_key=True),
+    db.Column('ingredient_id', db.Integer, db.ForeignKey('ingredients.id'), primary_key=True, index=True),
+)
+
+#indice invertido em memoria dos ingredientes (carregado no primeiro uso)
+ingredient_index = IngredientIndex()
+
+def _get_ingredient_index():
+    """
+    Retorna o indice invertido, carregando-o do banco na primeira chamada e
+    recarregando a cada INGREDIENT_INDEX_RELOAD_INTERVAL segundos (escritas
+    feitas por outros workers e pelo 'flask rebuild-ingredient-index').
+    """
+    ingredient_index.refresh(
+        lambda: db.session.execute(
+            db.select(recipe_ingredients.c.recipe_id, Ingredient.name)
+            .join(Ingredient, Ingredient.id == recipe_ingredients.c.ingredient_id)
+            .order_by(recipe_ingredients.c.recipe_id)
+        ),
+        current_app.config['INGREDIENT_INDEX_RELOAD_INTERVAL'],
+        current_app._get_current_object(),
+    )
+    return ingredient_index
+
+def _get_similarity_index():
+    """
+    Retorna o indice de similares, carregando as assinaturas do banco na
+    primeira chamada e recarregando a cada SIMILARITY_INDEX_RELOAD_INTERVAL
+    segundos (escritas de outros workers e 'flask build-similarity-index').
+    """
+    similarity_index.refresh(
+        lambda: db.session.execute(
+            db.select(RecipeSignature.recipe_id, RecipeSignature.signature)
+            .order_by(RecipeSignature.recipe_id)
+        ),
+        current_app.config['SIMILARITY_INDEX_RELOAD_INTERVAL'],
+        current_app._get_current_object(),
+    )
+    return similarity_index
+
+def _save_signatures(items, replace=False):
+    """
+    Calcula as assinaturas MinHash de (recipe_id, title, ingredients) e grava
+    na sessão (antes do commit). Retorna os pares (recipe_id, assinatura)
+    para _index_signatures depois do commit.
+    """
+    signatures = [
+        (recipe_id, similarity_index.signature(title, ingredients))
+        for recipe_id, title, ingredients in items
+    ]
+    if signatures:
+        if replace:
+            db.session.execute(db.delete(RecipeSignature).where(
+                RecipeSignature.recipe_id.in_([recipe_id for recipe_id, _ in signatures])
+            ))
+        db.session.execute(insert(RecipeSignature.__table__), [
+            {'recipe_id': recipe_id, 'signature': signature.tobytes()}
+            for recipe_id, signature in signatures
+        ])
+    return signatures
+
+def _index_signatures(signatures):
+    for recipe_id, signature in signatures:
+        similarity_index.set_recipe(recipe_id, signature)
+
+def _set_recipe_ingredients(recipe):
+    """
+    Normaliza o texto de ingredientes da receita e atualiza a relação com a
+    tabela de ingredientes (criando os que ainda não existem). Deve ser
+    chamada antes do commit. Retorna os nomes normalizados.
+    """
+    names = parse_ingredients(recipe.ingredients)
+    existing = {}
+    if names:
+        existing = {
+            item.name: item
+            for item in Ingredient.query.filter(Ingredient.name.in_(names))
+        }
+    new_names = names - existing.keys()
+    if new_names:
+        _insert_ingredients(new_names)
+        existing.update(
+            (item.name, item)
+            for item in Ingredient.query.filter(Ingredient.name.in_(new_names))
+        )
+    recipe.ingredient_items = list(existing.values())
+    return names
+
+def _insert_ingredients(names):
+    """
+    Cria os ingredientes com INSERT ... ON CONFLICT DO NOTHING: se uma escrita
+    concorrente criar o mesmo nome antes, a linha dela é reaproveitada (o
+    chamador seleciona de novo) em vez de virar IntegrityError.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        statement = sqlite.insert(Ingredient.__table__).on_conflict_do_nothing(index_elements=['name'])
+    elif dialect == 'postgresql':
+        statement = postgresql.insert(Ingredient.__table__).on_conflict_do_nothing(index_elements=['name'])
+    else:
+        statement = insert(Ingredient.__table__)
+    db.session.execute(statement, [{'name': name} for name in names])
+
+#--INDICE DE BUSCA (FTS5)--
+# Tabela virtual FTS5 com conteudo externo apontando para 'recipes'.
+# - unicode61 remove_diacritics 2: ignora acentos ("pao" encontra "pão")
+# - prefix '2 3': indices de prefixo para busca enquanto o usuario digita
+# Os triggers mantem o indice sincronizado em qualquer INSERT/UPDATE/DELETE.
+SEARCH_INDEX_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        title, description, ingredients,
+        content='recipes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, title, description, ingredients)
+        VALUES (new.id, new.title, new.description, new.ingredients);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description, ingredients)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description, ingredients)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients);
+        INSERT INTO recipes_fts(rowid, title, description, ingredients)
+        VALUES (new.id, new.title, new.description, new.ingredients);
+    END
+    """,
+)
+
+# pesos do bm25 para (title, description, ingredients)
+SEARCH_BM25_WEIGHTS = (10.0, 2.0, 5.0)
+
+@event.listens_for(Recipe.__table__, 'after_create')
+def create_search_index(target, connection, **kw):
+    """Cria a tabela FTS5 e os triggers junto com a tabela de receitas (apenas SQLite)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+def _ensure_search_index(rebuild=False):
+    """
+    Cria a tabela FTS5 e os triggers em um banco já existente (o after_create
+    só roda quando a tabela recipes é criada) e popula o indice se ele
+    acabou de ser criado ou se rebuild=True. Apenas SQLite.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    with db.engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipes_fts'")
+        ).first() is not None
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+        if rebuild or not exists:
+            connection.execute(text("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')"))
+
+def _fts_query(q):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira
+    um termo entre aspas com busca por prefixo, todos obrigatorios (AND).
+    """
+    terms = re.findall(r'\w+', q)
+    return ' '.join(f'"{term}"*' for term in terms)
     
 #-----------Rotas----------------------------
 
 
-@app.route('/')
+@api.route('/')
 def home():
     return "API de Receitas Gourmet está online!"
 #--------------------------------------------------------------------------------------------
 
 #--ROTAS USUARIOS--
 
+#pool de hash ou fila de escritas saturados: responde 503 em vez de enfileirar a requisição
+@api.app_errorhandler(HasherBusy)
+@api.app_errorhandler(WriteQueueFull)
+@api.app_errorhandler(Overloaded)
+def handle_busy(error):
+    response = jsonify({"message": "Servidor ocupado, tente novamente em instantes"})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@api.app_errorhandler(WriteTimeout)
+def handle_write_timeout(error):
+    if error.applied is False:
+        response = jsonify({"message": "A gravação não foi feita (tempo esgotado), tente novamente"})
+        response.status_code = 503
+    else:
+        #o commit pode ter acontecido: repetir a requisição pode duplicar a receita
+        response = jsonify({"message": "Tempo esgotado esperando a gravação; ela pode ter sido aplicada"})
+        response.status_code = 504
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@api.app_errorhandler(RateLimited)
+def handle_rate_limited(error):
+    response = jsonify({"message": "Muitas requisições, tente novamente mais tarde"})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 #rota para registrar um novo usuario
-@app.route('/users/register', methods=['POST'])
+@api.route('/users/register', methods=['POST'])
 def register():
     """
     Endpoint para registro de novo usuário.
@@ -91,6 +366,8 @@ def register():
         description: Usuário registrado com sucesso.
       400:
         description: Nome de usuário já existe ou dados ausentes.
+      503:
+        description: Servidor ocupado processando senhas, tente novamente (ver Retry-After).
     """
     data = request.get_json()
     username = data.get('username')
@@ -103,7 +380,7 @@ def register():
     if User.query.filter_by(username=username).first():
         return jsonify({"message": "Nome de usuário já existe"}), 400
 
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    hashed_password = password_hasher.generate_password_hash(password)
     new_user = User(username=username, password=hashed_password)
 
     db.session.add(new_user)
@@ -113,7 +390,7 @@ def register():
 
 
 #rota para fazer login de um usuario 
-@app.route('/users/login', methods=['POST'])
+@api.route('/users/login', methods=['POST'])
 def login():
     """
     Endpoint para login de usuario.
@@ -146,6 +423,8 @@ def login():
               description: Token JWT para autenticação.
       401:
         description: Nome de usuario ou senha incorretos   
+      503:
+        description: Servidor ocupado processando senhas, tente novamente (ver Retry-After).
     """
 
     data = request.get_json()
@@ -154,60 +433,611 @@ def login():
 
     user = User.query.filter_by(username=username).first()
 
-    if user and bcrypt.check_password_hash(user.password, password):
+    if user and password_hasher.check_password_hash(user.password, password):
+        #se o custo do bcrypt mudou no Config, refaz o hash com a senha correta
+        if password_hasher.needs_rehash(user.password):
+            user.password = password_hasher.generate_password_hash(password)
+            db.session.commit()
         #a identidade do token sera o id de usuario
         access_token= create_access_token(identity=str(user.id))
         return jsonify(access_token=access_token), 200
     else:
         return jsonify({"message":"Nome de usuario ou senha incorretos"}), 401
+def _load_revoked_tokens():
+    """Tokens revogados ainda não expirados, para reconstruir o filtro."""
+    return db.session.execute(
+        db.select(RevokedToken.jti, RevokedToken.expires_at)
+        .where(RevokedToken.expires_at > int(time.time()))
+        .execution_options(yield_per=1000)
+    )
+
+def _lookup_revoked_token(jti):
+    return db.session.get(RevokedToken, jti) is not None
+
+#o caso comum (token não revogado) é respondido pelo filtro de Bloom, sem I/O
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    return token_blocklist.is_revoked(jwt_payload['jti'])
+
+#rota para fazer logout (revoga o token atual)
+@api.route('/users/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """
+    Endpoint para logout: revoga o token JWT usado na requisição.
+    ---
+    tags:
+      - Usuarios
+    security:
+      - JWT: []
+    responses:
+      200:
+        description: Token revogado com sucesso.
+      401:
+        description: Token JWT ausente, inválido ou já revogado.
+    """
+    payload = get_jwt()
+    db.session.merge(RevokedToken(jti=payload['jti'], expires_at=int(payload['exp'])))
+    db.session.commit()
+    token_blocklist.revoke(payload['jti'], payload['exp'])
+    return jsonify({"message": "Logout realizado com sucesso"}), 200
 #------------------------------------------------------------------------------------------------
 
 #--ROTAS DE RECEITAS--
 
+#colunas retornadas nas listagens de receitas (sem montar objetos do ORM)
+RECIPE_COLUMNS = (
+    Recipe.id,
+    Recipe.title,
+    Recipe.description,
+    Recipe.ingredients,
+    Recipe.instructions,
+    Recipe.user_id,
+)
+
+RECIPE_COLUMNS_BY_NAME = {column.key: column for column in RECIPE_COLUMNS}
+
+#valores aceitos em ?include=
+RECIPE_INCLUDES = ('author',)
+
+def _recipe_row_to_dict(row):
+    """Converte uma linha (Row) de receita em dicionario."""
+    data = dict(row._mapping)
+    if 'author_id' in data:
+        data['author'] = {'id': data.pop('author_id'), 'username': data.pop('author_username')}
+    return data
+
+def _parse_include(include):
+    """Converte o parametro ?include=author em um conjunto. Levanta ValueError se invalido."""
+    names = {name.strip() for name in (include or '').split(',') if name.strip()}
+    unknown = names - set(RECIPE_INCLUDES)
+    if unknown:
+        raise ValueError(f"include desconhecido: {', '.join(sorted(unknown))}")
+    return names
+
+def _include_author(query):
+    """
+    Junta o autor na mesma consulta (JOIN), assim uma pagina com N receitas
+    continua custando uma unica consulta em vez de uma por receita.
+    """
+    return query.add_columns(
+        User.id.label('author_id'), User.username.label('author_username'),
+    ).join(User, User.id == Recipe.user_id)
+
+def _fetch_page(query, limit):
+    """Executa a consulta keyset e retorna (lista de dicionarios, next_cursor)."""
+    #busca um item a mais para saber se existe proxima pagina
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _encode_cursor(rows[-1].id) if has_more else None
+    return [_recipe_row_to_dict(row) for row in rows], next_cursor
+
+def _parse_fields(fields):
+    """
+    Converte o parametro ?fields=id,title em colunas para o SELECT.
+    O id é sempre incluido. Levanta ValueError para campos desconhecidos.
+    """
+    if not fields:
+        return RECIPE_COLUMNS
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in RECIPE_COLUMNS_BY_NAME]
+    if unknown:
+        raise ValueError(f"campos desconhecidos: {', '.join(unknown)}")
+    return tuple(column for column in RECIPE_COLUMNS if column.key == 'id' or column.key in names)
+
+def _encode_cursor(recipe_id):
+    """Gera o cursor opaco a partir do ultimo id da pagina."""
+    return base64.urlsafe_b64encode(str(recipe_id).encode()).decode().rstrip('=')
+
+def _parse_int_arg(name, default=None):
+    """
+    Le um parametro inteiro da query string. Levanta ValueError se não for
+    um inteiro (request.args.get(type=int) voltaria silenciosamente ao padrão).
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return int(value)
+
+def _parse_limit(default=None):
+    """Le o parametro ?limit=; levanta ValueError se não for um inteiro."""
+    return _parse_int_arg('limit', default)
+
+#maior valor de uma coluna INTEGER do banco (64 bits com sinal)
+MAX_DB_INTEGER = 2 ** 63 - 1
+
+def _decode_cursor(cursor):
+    """Decodifica o cursor opaco; levanta ValueError se for invalido ou fora de 0..MAX_DB_INTEGER."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError(cursor)
+    if not 0 <= value <= MAX_DB_INTEGER:
+        raise ValueError(cursor)
+    return value
+
+def _stream_recipes(query, fmt):
+    """
+    Gera o corpo da resposta aos pedaços a partir de um cursor do servidor,
+    assim a memoria fica constante independente do numero de receitas.
+    """
+    result = db.session.execute(
+        query.execution_options(stream_results=True, yield_per=current_app.config['RECIPES_STREAM_CHUNK'])
+    )
+    if fmt == 'ndjson':
+        for row in result:
+            yield json.dumps(_recipe_row_to_dict(row), ensure_ascii=False) + '\n'
+        return
+
+    yield '{"recipes": ['
+    first = True
+    for row in result:
+        if not first:
+            yield ','
+        first = False
+        yield json.dumps(_recipe_row_to_dict(row), ensure_ascii=False)
+    yield ']}'
+
+def _recipe_page_tags(kwargs, payload):
+    """
+    Tags de cache de uma pagina de receitas: cada id listado e, se for a
+    ultima pagina, 'recipes:tail' (novas receitas sempre entram no final).
+    No multi-get (?ids=) a tag 'recipes:tail' só entra se algum id faltou.
+    """
+    tags = {f"recipe:{recipe['id']}" for recipe in payload['recipes']}
+    if 'missing' in payload:
+        if payload['missing']:
+            tags.add('recipes:tail')
+    elif payload.get('next_cursor') is None:
+        if 'user_id' in kwargs:
+            tags.add(f"user:{kwargs['user_id']}:recipes:tail")
+        else:
+            tags.add('recipes:tail')
+    return tags
+
+def _parse_ids(ids):
+    """
+    Converte o parametro ?ids=1,2,3 em uma lista sem repetições. Levanta
+    ValueError se invalido ou com algum id fora de 1..MAX_DB_INTEGER.
+    """
+    values = []
+    for part in ids.split(','):
+        if part.strip():
+            value = int(part)
+            if not 1 <= value <= MAX_DB_INTEGER:
+                raise ValueError(part)
+            if value not in values:
+                values.append(value)
+    if not values:
+        raise ValueError(ids)
+    return values
+
+def _invalidate_recipe_cache(recipe_id=None, user_ids=()):
+    """
+    Invalida as respostas em cache afetadas pela escrita de uma receita.
+    Sem recipe_id (nova receita) invalida as ultimas paginas da listagem
+    geral e das listagens dos usuarios donos das receitas.
+    """
+    if recipe_id is None:
+        response_cache.invalidate('recipes:tail', *(f'user:{user_id}:recipes:tail' for user_id in user_ids))
+    else:
+        response_cache.invalidate(f'recipe:{recipe_id}')
+
+#rota para obter as receitas de um usuario:
+@api.route('/users/<int:user_id>/recipes', methods=['GET'])
+@response_cache.cached(tags=_recipe_page_tags)
+def get_user_recipes(user_id):
+    """
+    Obtém as receitas de um usuario com paginação por cursor (keyset no id).
+    ---
+    tags:
+      - Usuarios
+    parameters:
+      - name: user_id
+        in: path
+        type: integer
+        required: true
+        description: ID do usuario.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade maxima de receitas por pagina.
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Cursor opaco retornado em next_cursor na pagina anterior.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Campos retornados, separados por virgula (ex. id,title). O id sempre é incluido.
+      - name: include
+        in: query
+        type: string
+        enum: [author]
+        required: false
+        description: Inclui o autor (id e username) em cada receita.
+    responses:
+      200:
+        description: Retorna uma pagina de receitas do usuario e o cursor da proxima pagina.
+      400:
+        description: Parametros invalidos.
+      404:
+        description: Usuario não encontrado.
+    """
+    try:
+        limit = _parse_limit(current_app.config['RECIPES_PAGE_SIZE'])
+        after = request.args.get('after')
+        after_id = _decode_cursor(after) if after else None
+        columns = _parse_fields(request.args.get('fields'))
+        include = _parse_include(request.args.get('include'))
+    except ValueError as e:
+        return jsonify({"message": f"Parametros invalidos: {e}"}), 400
+    if not 1 <= limit <= current_app.config['RECIPES_MAX_PAGE_SIZE']:
+        return jsonify({"message": f"limit deve estar entre 1 e {current_app.config['RECIPES_MAX_PAGE_SIZE']}"}), 400
+
+    author = db.session.execute(
+        db.select(User.id, User.username).where(User.id == user_id)
+    ).first()
+    if author is None:
+        abort(404)
+
+    #usa o indice (user_id, id): sem varrer a tabela e já na ordem do cursor
+    query = db.select(*columns).where(Recipe.user_id == user_id).order_by(Recipe.id)
+    if after_id is not None:
+        query = query.where(Recipe.id > after_id)
+
+    output, next_cursor = _fetch_page(query, limit)
+    if 'author' in include:
+        #o autor é o mesmo para toda a pagina: já foi buscado acima
+        for recipe in output:
+            recipe['author'] = {'id': author.id, 'username': author.username}
+    return jsonify({"recipes": output, "next_cursor": next_cursor})
+
 #rota para obter todas as receitas:
-@app.route('/recipes', methods=['GET'])
+@api.route('/recipes', methods=['GET'])
+@response_cache.cached(tags=_recipe_page_tags)
 def get_recipes():
     """
-    Obtém todas as receitas.
+    Obtém as receitas com paginação por cursor (keyset no id).
     ---
     tags:
       - Receitas
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade maxima de receitas por pagina.
+      - name: after
+        in: query
+        type: string
+        required: false
+        description: Cursor opaco retornado em next_cursor na pagina anterior.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Campos retornados, separados por virgula (ex. id,title,user_id). O id sempre é incluido.
+      - name: include
+        in: query
+        type: string
+        enum: [author]
+        required: false
+        description: Inclui o autor (id e username) de cada receita na mesma consulta.
+      - name: stream
+        in: query
+        type: string
+        enum: [json, ndjson]
+        required: false
+        description: Envia todas as receitas (a partir do cursor) aos pedaços, em JSON ou NDJSON.
+      - name: ids
+        in: query
+        type: string
+        required: false
+        description: Busca varias receitas pelo id (ex. 1,2,3) em uma unica consulta; retorna tambem os ids não encontrados em missing. Não combina com after, limit e stream.
     responses:
       200:
-        description: Retorna um lista de todas as receitas.
+        description: Retorna uma pagina de receitas e o cursor da proxima pagina (ou, com ids, as receitas encontradas e os ids ausentes).
         schema:
-          type: array
-          items:
-            properties:
-              id:
-                type: integer
-              title:
-                type: string
-              description:
-                type: string
-              ingredients:
-                type: string
-              instructions:
-                type: string
-              user_id:
+          properties:
+            recipes:
+              type: array
+              items:
+                properties:
+                  id:
+                    type: integer
+                  title:
+                    type: string
+                  description:
+                    type: string
+                  ingredients:
+                    type: string
+                  instructions:
+                    type: string
+                  user_id:
+                    type: integer
+            next_cursor:
+              type: string
+              description: Cursor da proxima pagina (null quando nao ha mais receitas).
+            missing:
+              type: array
+              items:
                 type: integer
+              description: Ids pedidos em ids que não existem (só no multi-get).
+      400:
+        description: Parametros de paginação invalidos.
+    """
+    try:
+        columns = _parse_fields(request.args.get('fields'))
+        include = _parse_include(request.args.get('include'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if 'ids' in request.args:
+        return _get_recipes_by_ids(columns, include)
+
+    stream = request.args.get('stream')
+    if stream is not None and stream not in ('json', 'ndjson'):
+        return jsonify({"message": "stream deve ser 'json' ou 'ndjson'"}), 400
+
+    try:
+        limit = _parse_limit()
+        after = request.args.get('after')
+        after_id = _decode_cursor(after) if after else None
+    except ValueError:
+        return jsonify({"message": "Parametros de paginação invalidos"}), 400
+
+    if limit is None and stream is None:
+        limit = current_app.config['RECIPES_PAGE_SIZE']
+    if limit is not None and not 1 <= limit <= current_app.config['RECIPES_MAX_PAGE_SIZE']:
+        return jsonify({"message": f"limit deve estar entre 1 e {current_app.config['RECIPES_MAX_PAGE_SIZE']}"}), 400
+
+    query = db.select(*columns).order_by(Recipe.id)
+    if after_id is not None:
+        query = query.where(Recipe.id > after_id)
+    if 'author' in include:
+        query = _include_author(query)
+
+    if stream:
+        if limit is not None:
+            query = query.limit(limit)
+        mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+        return Response(stream_with_context(_stream_recipes(query, stream)), mimetype=mimetype)
+
+    output, next_cursor = _fetch_page(query, limit)
+    return jsonify({"recipes": output, "next_cursor": next_cursor})
+
+def _get_recipes_by_ids(columns, include):
+    """Multi-get do GET /recipes?ids=: uma unica consulta IN, na ordem pedida."""
+    if any(name in request.args for name in ('after', 'limit', 'stream')):
+        return jsonify({"message": "ids não pode ser combinado com after, limit ou stream"}), 400
+    try:
+        ids = _parse_ids(request.args['ids'])
+    except ValueError:
+        return jsonify({"message": "ids deve ser uma lista de inteiros positivos separados por virgula"}), 400
+    max_ids = current_app.config['RECIPES_MAX_PAGE_SIZE']
+    if len(ids) > max_ids:
+        return jsonify({"message": f"no maximo {max_ids} ids por requisição"}), 400
+
+    query = db.select(*columns).where(Recipe.id.in_(ids))
+    if 'author' in include:
+        query = _include_author(query)
+    found = {row.id: _recipe_row_to_dict(row) for row in db.session.execute(query)}
+    return jsonify({
+        "recipes": [found[recipe_id] for recipe_id in ids if recipe_id in found],
+        "missing": [recipe_id for recipe_id in ids if recipe_id not in found],
+    })
+
+#rota para buscar receitas por texto:
+@api.route('/recipes/search', methods=['GET'])
+def search_recipes():
+    """
+    Busca receitas por texto no titulo, descrição e ingredientes.
+    ---
+    tags:
+      - Receitas
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Texto da busca (acentos ignorados, palavras buscadas por prefixo).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade maxima de resultados.
+    responses:
+      200:
+        description: Retorna as receitas encontradas ordenadas por relevancia (BM25).
+      400:
+        description: Parametro q ausente ou invalido, ou limit invalido.
     """
-    recipes = Recipe.query.all()
+    q = request.args.get('q', '')
+    match = _fts_query(q)
+    if not match:
+        return jsonify({"message": "Parametro q é obrigatorio"}), 400
+
+    try:
+        limit = _parse_limit(current_app.config['RECIPES_PAGE_SIZE'])
+    except ValueError:
+        return jsonify({"message": "limit deve ser um inteiro"}), 400
+    if not 1 <= limit <= current_app.config['RECIPES_MAX_PAGE_SIZE']:
+        return jsonify({"message": f"limit deve estar entre 1 e {current_app.config['RECIPES_MAX_PAGE_SIZE']}"}), 400
+
+    weights = ', '.join(str(w) for w in SEARCH_BM25_WEIGHTS)
+    rows = db.session.execute(text(f"""
+        SELECT r.id, r.title, r.description, r.ingredients, r.instructions, r.user_id,
+               bm25(recipes_fts, {weights}) AS score
+        FROM recipes_fts
+        JOIN recipes r ON r.id = recipes_fts.rowid
+        WHERE recipes_fts MATCH :match
+        ORDER BY score
+        LIMIT :limit
+    """), {'match': match, 'limit': limit}).all()
+
     output = []
-    for recipe in recipes:
-        recipe_data = {}
-        recipe_data['id'] = recipe.id
-        recipe_data['title'] = recipe.title
-        recipe_data['description'] = recipe.description
-        recipe_data['ingredients'] = recipe.ingredients
-        recipe_data['instructions'] = recipe.instructions
-        recipe_data['user_id'] = recipe.user_id
+    for row in rows:
+        recipe_data = _recipe_row_to_dict(row)
+        #bm25 retorna valores negativos (quanto menor, mais relevante)
+        recipe_data['score'] = -row.score
         output.append(recipe_data)
 
     return jsonify({"recipes": output})
 
+#rota para buscar receitas pelos ingredientes disponiveis:
+@api.route('/recipes/by-ingredients', methods=['GET'])
+def recipes_by_ingredients():
+    """
+    Busca receitas que podem ser feitas com os ingredientes informados.
+    ---
+    tags:
+      - Receitas
+    parameters:
+      - name: have
+        in: query
+        type: string
+        required: true
+        description: Ingredientes disponiveis separados por virgula (ex. ovos,farinha,leite).
+      - name: max_missing
+        in: query
+        type: integer
+        required: false
+        description: Numero maximo de ingredientes faltando.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Quantidade maxima de resultados.
+    responses:
+      200:
+        description: Receitas ordenadas por menos ingredientes faltando e maior cobertura.
+      400:
+        description: Parametro have ausente ou max_missing/limit invalidos.
+    """
+    have = parse_ingredients(request.args.get('have', ''))
+    if not have:
+        return jsonify({"message": "Parametro have é obrigatorio"}), 400
+
+    try:
+        max_missing = _parse_int_arg('max_missing')
+        limit = _parse_limit(current_app.config['RECIPES_PAGE_SIZE'])
+    except ValueError:
+        return jsonify({"message": "max_missing e limit devem ser inteiros"}), 400
+    if max_missing is not None and max_missing < 0:
+        return jsonify({"message": "max_missing não pode ser negativo"}), 400
+    if not 1 <= limit <= current_app.config['RECIPES_MAX_PAGE_SIZE']:
+        return jsonify({"message": f"limit deve estar entre 1 e {current_app.config['RECIPES_MAX_PAGE_SIZE']}"}), 400
+
+    index = _get_ingredient_index()
+    matches = index.query(have, limit=limit, max_missing=max_missing)
+
+    #busca os titulos em uma unica consulta (e descarta receitas apagadas
+    #por outro worker que o indice ainda não viu)
+    ids = [recipe_id for recipe_id, _, _ in matches]
+    titles = dict(db.session.execute(
+        db.select(Recipe.id, Recipe.title).where(Recipe.id.in_(ids))
+    ).all()) if ids else {}
+
+    output = []
+    for recipe_id, coverage, missing in matches:
+        if recipe_id not in titles:
+            continue
+        output.append({
+            'id': recipe_id,
+            'title': titles[recipe_id],
+            'coverage': coverage,
+            'missing_count': missing,
+            'missing': index.missing_for(recipe_id, have),
+        })
+
+    return jsonify({"recipes": output})
+
+@api.route('/recipes/<int:recipe_id>/similar', methods=['GET'])
+def similar_recipes(recipe_id):
+    """
+    Lista as receitas mais parecidas (ingredientes e titulo) com a receita informada.
+    ---
+    tags:
+      - Receitas
+    parameters:
+      - name: recipe_id
+        in: path
+        type: integer
+        required: true
+        description: ID da receita.
+      - name: k
+        in: query
+        type: integer
+        required: false
+        description: Quantidade maxima de receitas similares (padrão 10).
+    responses:
+      200:
+        description: Receitas ordenadas pela similaridade estimada (0 a 1).
+      400:
+        description: Parametro k invalido.
+      404:
+        description: Receita não encontrada.
+    """
+    try:
+        k = _parse_int_arg('k', 10)
+    except ValueError:
+        return jsonify({"message": "k deve ser um inteiro"}), 400
+    if not 1 <= k <= current_app.config['RECIPES_MAX_PAGE_SIZE']:
+        return jsonify({"message": f"k deve estar entre 1 e {current_app.config['RECIPES_MAX_PAGE_SIZE']}"}), 400
+
+    index = _get_similarity_index()
+    signature = index.get(recipe_id)
+    if signature is None:
+        #receita ainda sem assinatura (indice não construido): calcula na hora
+        row = db.session.execute(
+            db.select(Recipe.title, Recipe.ingredients).where(Recipe.id == recipe_id)
+        ).first()
+        if row is None:
+            abort(404)
+        signature = index.signature(row.title, row.ingredients)
+    matches = index.query(signature, k=k, exclude=recipe_id)
+
+    #busca os titulos em uma unica consulta (e descarta receitas já apagadas)
+    ids = [similar_id for similar_id, _ in matches]
+    titles = dict(db.session.execute(
+        db.select(Recipe.id, Recipe.title).where(Recipe.id.in_(ids))
+    ).all()) if ids else {}
+
+    output = [
+        {'id': similar_id, 'title': titles[similar_id], 'similarity': round(similarity, 3)}
+        for similar_id, similarity in matches
+        if similar_id in titles
+    ]
+    return jsonify({"recipe_id": recipe_id, "recipes": output})
+
 #rota para adicionar nova receita:
-@app.route('/recipes', methods=['POST'])
+@api.route('/recipes', methods=['POST'])
 @jwt_required()
 def add_recipe():
     """
@@ -248,6 +1078,10 @@ def add_recipe():
         description: Token JWT ausente ou inválido.
       400:
         description: Dados ausentes no corpo da requisição.
+      503:
+        description: Fila de escritas cheia ou gravação cancelada por tempo esgotado (modo de agrupamento), tente novamente.
+      504:
+        description: Tempo esgotado com a gravação em andamento; a receita pode ter sido criada.
     """
     try:
         # Tenta obter o JSON, se falhar, data será None ou a exceção será capturada
@@ -262,6 +1096,22 @@ def add_recipe():
 
     if not data or not data.get('title') or not data.get('description') or not data.get('ingredients') or not data.get('instructions'):
         return jsonify({"message": "Dados incompletos para a receita"}), 400
+    invalid = _non_string_fields(data)
+    if invalid:
+        return jsonify({"message": f"campos devem ser texto: {', '.join(invalid)}"}), 400
+
+    if recipe_batcher.enabled:
+        #group commit: a thread escritora grava esta receita junto com as
+        #concorrentes e só retorna depois do commit
+        recipe_id = recipe_batcher.submit({
+            'title': data['title'],
+            'description': data['description'],
+            'ingredients': data['ingredients'],
+            'instructions': data['instructions'],
+            'user_id': int(current_user_id),
+        })
+        _invalidate_recipe_cache(user_ids=[int(current_user_id)])
+        return jsonify({"message": "Receita adicionada com sucesso!", "recipe_id": recipe_id}), 201
 
     new_recipe = Recipe(
         title=data['title'],
@@ -272,41 +1122,61 @@ def add_recipe():
     )
 
     db.session.add(new_recipe)
+    ingredient_names = _set_recipe_ingredients(new_recipe)
+    db.session.flush()
+    signatures = _save_signatures([(new_recipe.id, new_recipe.title, new_recipe.ingredients)])
     db.session.commit()
+    ingredient_index.set_recipe(new_recipe.id, ingredient_names)
+    _index_signatures(signatures)
+    _invalidate_recipe_cache(user_ids=[new_recipe.user_id])
     return jsonify({"message": "Receita adicionada com sucesso!", "recipe_id": new_recipe.id}), 201
 
 
 
 #rota para receber a receita por ID:
-@app.route('/recipes/<int:recipe_id>', methods=['GET'])
+@api.route('/recipes/<int:recipe_id>', methods=['GET'])
+@response_cache.cached(tags=lambda kwargs, payload: {f"recipe:{kwargs['recipe_id']}"})
 def get_recipe(recipe_id):
     """
     Obtem uma receita especifica pelo ID.
     ---
     tags:
+      - Receitas
+    parameters:
       - name: recipe_id
         in: path
         type: integer
         required: true
         description: ID da receita.
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Campos retornados, separados por virgula (ex. id,title). O id sempre é incluido.
     responses:
       200:
         description: Retorna os detalhes da receita.
       400:
-        description: Receirta não encontrada.
+        description: Campos desconhecidos em fields.
+      404:
+        description: Receita não encontrada.
     """
-    recipe = Recipe.query.get_or_404(recipe_id)
-    return jsonify ({
-        "id": recipe_id,
-        "tile": recipe.title,
-        "description": recipe.description,
-        "ingredients": recipe.ingredients,
-        "instructions": recipe.instructions,
-        "user_id": recipe.user_id
-    })
+    try:
+        columns = _parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    #seleciona só as colunas pedidas, sem montar o objeto Recipe
+    row = db.session.execute(
+        db.select(*columns).where(Recipe.id == recipe_id)
+    ).first()
+    if row is None:
+        abort(404)
+    return jsonify(_recipe_row_to_dict(row))
 
 #rota para atualizar um receita existente:
-@app.route('/recipes/<int:recipe_id>', methods=['PUT'])
+@api.route('/recipes/<int:recipe_id>', methods=['PUT'])
+@jwt_required()
 def update_recipe(recipe_id):
     """
     Atualiza uma receita existente.
@@ -348,20 +1218,35 @@ def update_recipe(recipe_id):
     current_user_id= get_jwt_identity()
     recipe = Recipe.query.get_or_404(recipe_id)
 
-    if recipe.user_id != current_user_id:
+    # a identidade do token é o id do usuario em string
+    if str(recipe.user_id) != current_user_id:
       return jsonify({"message": "Voce não tem permissão para atualizar essa receita"}), 403
     
     data = request.get_json()
+    if data and not isinstance(data, dict):
+        return jsonify({"message": "O corpo deve ser um objeto JSON"}), 400
+    invalid = _non_string_fields(data or {})
+    if invalid:
+        return jsonify({"message": f"campos devem ser texto: {', '.join(invalid)}"}), 400
     if data:
           recipe.title= data.get('title', recipe.title)
           recipe.description= data.get('description', recipe.description)
           recipe.ingredients= data.get('ingredients', recipe.ingredients)
           recipe.instructions= data.get('instructions', recipe.instructions)
+          ingredient_names = _set_recipe_ingredients(recipe) if 'ingredients' in data else None
+          signatures = []
+          if 'title' in data or 'ingredients' in data:
+              signatures = _save_signatures([(recipe_id, recipe.title, recipe.ingredients)], replace=True)
           db.session.commit()
+          if ingredient_names is not None:
+              ingredient_index.set_recipe(recipe_id, ingredient_names)
+          _index_signatures(signatures)
+          _invalidate_recipe_cache(recipe_id)
           return jsonify({"message": f"A receita {recipe_id} foi atualizada com sucesso"})
     return jsonify ({"message": "Nenhum dado fornecido para atualização"}), 400
 
-@app.route('/recipes/<int:recipe_id>', methods=['DELETE'])
+@api.route('/recipes/<int:recipe_id>', methods=['DELETE'])
+@jwt_required()
 def delete_recipe(recipe_id):
     """
     Deleta uma receita existente (por id).
@@ -381,30 +1266,592 @@ def delete_recipe(recipe_id):
       200:
         description: Receita deletada com sucesso.
       401:
+        description: Token JWT ausente ou inválido.
+      403:
         description: Você não tem permissão para deletar esta receita.
       404: 
         description: Receita não encontrada.
     """
-    corrent_user_id= get_jwt_identity()
+    current_user_id= get_jwt_identity()
     recipe = Recipe.query.get_or_404(recipe_id)
 
-    if recipe.user_id != get_jwt_identity():
-      return jsonify({"message": f"a receita {recipe_id} foi deletada com sucesso"})
+    if str(recipe.user_id) != current_user_id:
+      return jsonify({"message": "Voce não tem permissão para deletar essa receita"}), 403
+
+    db.session.execute(db.delete(RecipeSignature).where(RecipeSignature.recipe_id == recipe_id))
+    db.session.delete(recipe)
+    db.session.commit()
+    ingredient_index.remove_recipe(recipe_id)
+    similarity_index.remove_recipe(recipe_id)
+    _invalidate_recipe_cache(recipe_id)
+    return jsonify({"message": f"a receita {recipe_id} foi deletada com sucesso"})
+
+#--OPERAÇÕES EM LOTE (POST /batch)--
+
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+
+class BatchOperationError(Exception):
+    """Falha de uma operação do POST /batch (desfaz o lote inteiro)."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _load_batch_recipes(operations):
+    """Carrega, com uma unica consulta IN, as receitas alteradas pelas operações do lote."""
+    ids = {op.get('id') for op in operations if isinstance(op, dict) and op.get('op') in ('update', 'delete')}
+    ids = [
+        recipe_id for recipe_id in ids
+        if isinstance(recipe_id, int) and not isinstance(recipe_id, bool) and 1 <= recipe_id <= MAX_DB_INTEGER
+    ]
+    if not ids:
+        return {}
+    recipes = db.session.execute(
+        db.select(Recipe).where(Recipe.id.in_(ids)).options(db.undefer_group('body'))
+    ).scalars()
+    return {recipe.id: recipe for recipe in recipes}
+
+def _apply_batch_operation(op, recipes, user_id, changes):
+    """
+    Aplica uma operação na sessão (sem commit) e retorna o resultado dela.
+    'changes' acumula o que deve ser refletido nos indices e no cache depois do commit.
+    """
+    if not isinstance(op, dict) or op.get('op') not in BATCH_OPERATIONS:
+        raise BatchOperationError(400, f"op deve ser um de: {', '.join(BATCH_OPERATIONS)}")
+    data = op.get('data') or {}
+    if not isinstance(data, dict):
+        raise BatchOperationError(400, "data deve ser um objeto")
+
+    invalid = [field for field in RECIPE_FIELDS if field in data and not (isinstance(data[field], str) and data[field])]
+    if invalid:
+        raise BatchOperationError(400, f"campos devem ser texto não vazio: {', '.join(invalid)}")
+
+    if op['op'] == 'create':
+        missing = [field for field in RECIPE_FIELDS if field not in data]
+        if missing:
+            raise BatchOperationError(400, f"campos ausentes: {', '.join(missing)}")
+        recipe = Recipe(user_id=user_id, **{field: data[field] for field in RECIPE_FIELDS})
+        db.session.add(recipe)
+        names = _set_recipe_ingredients(recipe)
+        db.session.flush()
+        recipes[recipe.id] = recipe
+        changes['ingredients'].append((recipe.id, names))
+        changes['signatures'] += _save_signatures([(recipe.id, recipe.title, recipe.ingredients)])
+        changes['owners'].add(user_id)
+        return {'status': 201, 'id': recipe.id}
+
+    recipe_id = op.get('id')
+    recipe = recipes.get(recipe_id) if not isinstance(recipe_id, bool) else None
+    if recipe is None:
+        raise BatchOperationError(404, "Receita não encontrada")
+    if recipe.user_id != user_id:
+        raise BatchOperationError(403, "Voce não tem permissão para alterar essa receita")
+
+    if op['op'] == 'update':
+        fields = [field for field in RECIPE_FIELDS if field in data]
+        if not fields:
+            raise BatchOperationError(400, "Nenhum dado fornecido para atualização")
+        for field in fields:
+            setattr(recipe, field, data[field])
+        if 'ingredients' in data:
+            changes['ingredients'].append((recipe.id, _set_recipe_ingredients(recipe)))
+        if 'title' in data or 'ingredients' in data:
+            changes['signatures'] += _save_signatures(
+                [(recipe.id, recipe.title, recipe.ingredients)], replace=True,
+            )
+        db.session.flush()
+    else:
+        db.session.execute(db.delete(RecipeSignature).where(RecipeSignature.recipe_id == recipe.id))
+        db.session.delete(recipe)
+        db.session.flush()
+        del recipes[recipe.id]
+        changes['removed'].append(recipe.id)
+    changes['updated'].append(recipe.id)
+    return {'status': 200, 'id': recipe.id}
+
+@api.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_recipes():
+    """
+    Aplica varias operações de receitas (create, update, delete) em uma unica transação.
+    Se alguma operação falhar nenhuma é aplicada.
+    ---
+    tags:
+      - Receitas
+    security:
+      - JWT: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          id: BatchOperations
+          required:
+            - operations
+          properties:
+            operations:
+              type: array
+              items:
+                properties:
+                  op:
+                    type: string
+                    enum: [create, update, delete]
+                  id:
+                    type: integer
+                    description: ID da receita (update e delete).
+                  data:
+                    type: object
+                    description: Campos da receita (create e update).
+    responses:
+      200:
+        description: Todas as operações aplicadas; results traz o status e o id de cada uma.
+      400:
+        description: Corpo invalido ou alguma operação falhou (nada foi aplicado); results indica qual.
+      401:
+        description: Token JWT ausente ou inválido.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"message": "operations deve ser uma lista não vazia"}), 400
+    max_operations = current_app.config['BATCH_MAX_OPERATIONS']
+    if len(operations) > max_operations:
+        return jsonify({"message": f"no maximo {max_operations} operações por lote"}), 400
+
+    user_id = int(get_jwt_identity())
+    changes = {'ingredients': [], 'signatures': [], 'removed': [], 'updated': [], 'owners': set()}
+    recipes = _load_batch_recipes(operations)
+    results = []
+    failed = None
+    for index, op in enumerate(operations):
+        try:
+            results.append(_apply_batch_operation(op, recipes, user_id, changes))
+        except BatchOperationError as e:
+            failed = index
+            results.append({'status': e.status, 'message': e.message})
+            break
+        except SQLAlchemyError:
+            failed = index
+            results.append({'status': 400, 'message': "Erro ao gravar a operação"})
+            break
+
+    if failed is not None:
+        db.session.rollback()
+        #as anteriores foram desfeitas e as seguintes nem foram executadas (424)
+        not_applied = {'status': 424, 'message': "Não aplicada"}
+        results = [result if index == failed else not_applied for index, result in enumerate(results)]
+        results += [not_applied] * (len(operations) - len(results))
+        return jsonify({
+            "message": f"A operação {failed} falhou; nenhuma operação foi aplicada",
+            "applied": False,
+            "results": results,
+        }), 400
+
+    db.session.commit()
+    removed = set(changes['removed'])
+    for recipe_id, names in changes['ingredients']:
+        if recipe_id not in removed:
+            ingredient_index.set_recipe(recipe_id, names)
+    for recipe_id in removed:
+        ingredient_index.remove_recipe(recipe_id)
+        similarity_index.remove_recipe(recipe_id)
+    _index_signatures([item for item in changes['signatures'] if item[0] not in removed])
+    if changes['owners']:
+        _invalidate_recipe_cache(user_ids=changes['owners'])
+    for recipe_id in set(changes['updated']):
+        _invalidate_recipe_cache(recipe_id)
+    return jsonify({"applied": True, "results": results})
+
+#--IMPORTAÇÃO / EXPORTAÇÃO EM LOTE--
+
+RECIPE_FIELDS = ('title', 'description', 'ingredients', 'instructions')
+
+def _non_string_fields(data):
+    """Campos de receita presentes em 'data' que não são texto."""
+    return [field for field in RECIPE_FIELDS if field in data and not isinstance(data[field], str)]
+
+def _parse_import_line(line, user_id=None):
+    """
+    Valida uma linha NDJSON e retorna o dicionario pronto para inserir.
+    Se user_id for informado (importação via API) ele substitui o da linha.
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("a linha deve ser um objeto JSON")
+    missing = [field for field in RECIPE_FIELDS if not data.get(field)]
+    if missing:
+        raise ValueError(f"campos ausentes: {', '.join(missing)}")
+    invalid = _non_string_fields(data)
+    if invalid:
+        raise ValueError(f"campos devem ser texto: {', '.join(invalid)}")
+    owner = user_id if user_id is not None else data.get('user_id')
+    if owner is None:
+        raise ValueError("user_id ausente")
+    row = {field: data[field] for field in RECIPE_FIELDS}
+    if len(row['title']) > 100:
+        raise ValueError("title deve ter no maximo 100 caracteres")
+    row['user_id'] = int(owner)
+    return row
+
+def _link_ingredients_bulk(pairs):
+    """
+    Versão em lote de _set_recipe_ingredients para receitas inseridas via Core.
+    'pairs' é uma lista de (recipe_id, nomes_normalizados).
+    """
+    names = set().union(*(names for _, names in pairs))
+    if not names:
+        return
+    ids = dict(db.session.execute(
+        db.select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(names))
+    ).all())
+    new_names = names - ids.keys()
+    if new_names:
+        _insert_ingredients(new_names)
+        ids.update(db.session.execute(
+            db.select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(new_names))
+        ).all())
+    links = [
+        {'recipe_id': recipe_id, 'ingredient_id': ids[name]}
+        for recipe_id, recipe_names in pairs
+        for name in recipe_names
+    ]
+    if links:
+        db.session.execute(recipe_ingredients.insert(), links)
+
+def _insert_recipe_rows(rows):
+    """Insere as receitas com um unico executemany e faz o commit. Retorna os ids."""
+    recipe_ids = db.session.execute(
+        insert(Recipe.__table__).returning(Recipe.id, sort_by_parameter_order=True),
+        rows,
+    ).scalars().all()
+    pairs = [(recipe_id, parse_ingredients(row['ingredients'])) for recipe_id, row in zip(recipe_ids, rows)]
+    _link_ingredients_bulk(pairs)
+    signatures = _save_signatures([
+        (recipe_id, row['title'], row['ingredients']) for recipe_id, row in zip(recipe_ids, rows)
+    ])
+    db.session.commit()
+    for recipe_id, names in pairs:
+        ingredient_index.set_recipe(recipe_id, names)
+    _index_signatures(signatures)
+    return recipe_ids
+
+def _flush_import_batch(batch, result):
+    """Grava um lote em uma transação; se falhar, isola as linhas com erro."""
+    try:
+        result['imported'] += len(_insert_recipe_rows([row for _, row in batch]))
+        return
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    for line_no, row in batch:
+        try:
+            result['imported'] += len(_insert_recipe_rows([row]))
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            _add_import_error(result, line_no, str(getattr(e, 'orig', None) or e))
+
+def _add_import_error(result, line_no, message):
+    if len(result['errors']) < current_app.config['BULK_IMPORT_MAX_ERRORS']:
+        result['errors'].append({'line': line_no, 'message': message})
+    else:
+        result['errors_truncated'] = True
+
+def import_recipes(lines, user_id=None, batch_size=None):
+    """
+    Importa receitas de um iteravel de linhas NDJSON, em lotes de
+    'batch_size' (uma transação por lote). Linhas invalidas são reportadas
+    em 'errors' sem interromper a importação.
+    """
+    batch_size = batch_size or current_app.config['BULK_IMPORT_BATCH_SIZE']
+    result = {'imported': 0, 'errors': []}
+    batch = []
+    owners = set()
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            row = _parse_import_line(line, user_id)
+            batch.append((line_no, row))
+            owners.add(row['user_id'])
+        except (ValueError, TypeError) as e:
+            _add_import_error(result, line_no, str(e))
+        if len(batch) >= batch_size:
+            _flush_import_batch(batch, result)
+            batch = []
+    if batch:
+        _flush_import_batch(batch, result)
+
+    if result['imported']:
+        _invalidate_recipe_cache(user_ids=owners)
+    return result
+
+#rota para importar receitas em lote:
+@api.route('/recipes/bulk', methods=['POST'])
+@jwt_required()
+def bulk_import_recipes():
+    """
+    Importa receitas em lote a partir de um corpo NDJSON (uma receita por linha).
+    ---
+    tags:
+      - Receitas
+    security:
+      - JWT: []
+    consumes:
+      - application/x-ndjson
+    parameters:
+      - name: batch_size
+        in: query
+        type: integer
+        required: false
+        description: Quantidade de receitas gravadas por transação.
+      - name: body
+        in: body
+        required: true
+        description: Uma receita por linha com title, description, ingredients e instructions.
+        schema:
+          type: string
+    responses:
+      200:
+        description: Quantidade importada e erros por linha.
+        schema:
+          properties:
+            imported:
+              type: integer
+            errors:
+              type: array
+              items:
+                properties:
+                  line:
+                    type: integer
+                  message:
+                    type: string
+      400:
+        description: batch_size invalido.
+      401:
+        description: Token JWT ausente ou inválido.
+    """
+    try:
+        batch_size = _parse_int_arg('batch_size')
+    except ValueError:
+        return jsonify({"message": "batch_size deve ser um inteiro"}), 400
+    if batch_size is not None and not 1 <= batch_size <= current_app.config['BULK_IMPORT_MAX_BATCH_SIZE']:
+        return jsonify({"message": f"batch_size deve estar entre 1 e {current_app.config['BULK_IMPORT_MAX_BATCH_SIZE']}"}), 400
+
+    # o corpo é lido linha a linha, sem carregar tudo na memoria
+    result = import_recipes(request.stream, user_id=get_jwt_identity(), batch_size=batch_size)
+    return jsonify(result)
+
+#rota para exportar todas as receitas:
+@api.route('/recipes/export', methods=['GET'])
+def export_recipes():
+    """
+    Exporta todas as receitas em NDJSON (uma receita por linha), aos pedaços.
+    ---
+    tags:
+      - Receitas
+    produces:
+      - application/x-ndjson
+    responses:
+      200:
+        description: Todas as receitas, uma por linha.
+    """
+    query = db.select(*RECIPE_COLUMNS).order_by(Recipe.id)
+    return Response(stream_with_context(_stream_recipes(query, 'ndjson')), mimetype='application/x-ndjson')
+
 #-------------------------------------------------------------------------------------------
 
-@app.cli.command("create-db")
+#rota com os contadores do cache de respostas:
+@api.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Retorna os contadores do cache de respostas.
+    ---
+    tags:
+      - Monitoramento
+    responses:
+      200:
+        description: Entradas, acertos, falhas, remoções por LRU e invalidações.
+    """
+    return jsonify(response_cache.stats())
+
+def _response_cache_metrics():
+    """Expõe os contadores do cache de respostas no /metrics."""
+    stats = response_cache.stats()
+    lines = [
+        '# HELP response_cache_entries Entradas atualmente no cache de respostas.',
+        '# TYPE response_cache_entries gauge',
+        f"response_cache_entries {stats['entries']}",
+    ]
+    for name in ('hits', 'misses', 'evictions', 'invalidations'):
+        lines.append(f'# HELP response_cache_{name}_total Contador de {name} do cache de respostas.')
+        lines.append(f'# TYPE response_cache_{name}_total counter')
+        lines.append(f'response_cache_{name}_total {stats[name]}')
+    return lines
+
+metrics.register_collector(_response_cache_metrics)
+metrics.register_collector(recipe_batcher.render_metrics)
+metrics.register_collector(admission.render_metrics)
+
+#rota com as metricas no formato do Prometheus:
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Metricas de latencia, consultas SQL, tempo de banco e N+1 por endpoint.
+    ---
+    tags:
+      - Monitoramento
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Metricas no formato texto do Prometheus.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.cli.command("create-db")
 def create_db():
     """Cria as tabelas do banco de dados a partir dos modelos."""
-    with app.app_context():
-        db.create_all()
-        print("Banco de dados e tabelas criados com sucesso!")
+    db.create_all()
+    #create_all não cria indices novos em tabelas que já existem
+    for index in Recipe.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    #nem a tabela FTS5 e seus triggers (criados pelo after_create de recipes)
+    _ensure_search_index(rebuild=True)
+    print("Banco de dados e tabelas criados com sucesso!")
+
+@api.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """Cria (se ausente) e reconstroi o indice de busca FTS5 a partir da tabela de receitas."""
+    _ensure_search_index(rebuild=True)
+    print("Indice de busca reconstruido com sucesso!")
+
+@api.cli.command("rebuild-ingredient-index")
+def rebuild_ingredient_index():
+    """
+    Extrai e normaliza os ingredientes de todas as receitas existentes.
+    Os servidores em execução recarregam o indice em até INGREDIENT_INDEX_RELOAD_INTERVAL segundos.
+    """
+    db.create_all()
+    count = 0
+    last_id = 0
+    # um commit por bloco de receitas (paginação por id: o commit fecharia o cursor)
+    while True:
+        rows = db.session.execute(
+            db.select(Recipe.id, Recipe.ingredients)
+            .where(Recipe.id > last_id).order_by(Recipe.id).limit(1000)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(db.delete(recipe_ingredients).where(
+            recipe_ingredients.c.recipe_id.in_([recipe_id for recipe_id, _ in rows])
+        ))
+        _link_ingredients_bulk([(recipe_id, parse_ingredients(text)) for recipe_id, text in rows])
+        db.session.commit()
+        count += len(rows)
+        last_id = rows[-1][0]
+    ingredient_index.loaded = False
+    print(f"Ingredientes de {count} receitas indexados com sucesso!")
+
+@api.cli.command("build-similarity-index")
+def build_similarity_index():
+    """
+    Calcula as assinaturas MinHash de todas as receitas (indice de similares).
+    Os servidores em execução recarregam o indice em até SIMILARITY_INDEX_RELOAD_INTERVAL segundos.
+    """
+    db.create_all()
+    db.session.execute(db.delete(RecipeSignature))
+    result = db.session.execute(
+        db.select(Recipe.id, Recipe.title, Recipe.ingredients).order_by(Recipe.id)
+        .execution_options(yield_per=1000)
+    )
+    count = 0
+    for rows in result.partitions():
+        _save_signatures(rows)
+        count += len(rows)
+    db.session.commit()
+    similarity_index.loaded = False
+    print(f"Assinaturas de {count} receitas calculadas com sucesso!")
+
+@api.cli.command("import-recipes")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--batch-size", type=int, default=None, help="Receitas gravadas por transação.")
+@click.option("--user-id", type=int, default=None, help="Dono das receitas (substitui o user_id das linhas).")
+def import_recipes_command(path, batch_size, user_id):
+    """Importa receitas de um arquivo NDJSON ('-' para a entrada padrão)."""
+    with click.open_file(path, 'r', encoding='utf-8') as lines:
+        result = import_recipes(lines, user_id=user_id, batch_size=batch_size)
+    for error in result['errors']:
+        print(f"linha {error['line']}: {error['message']}", file=sys.stderr)
+    print(f"{result['imported']} receitas importadas, {len(result['errors'])} erros.")
+
+@api.cli.command("export-recipes")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True, allow_dash=True), default='-')
+def export_recipes_command(path):
+    """Exporta todas as receitas em NDJSON para um arquivo ('-' para a saida padrão)."""
+    query = db.select(*RECIPE_COLUMNS).order_by(Recipe.id)
+    with click.open_file(path, 'w', encoding='utf-8') as out:
+        for chunk in _stream_recipes(query, 'ndjson'):
+            out.write(chunk)
+
+@api.cli.command("prune-revoked-tokens")
+def prune_revoked_tokens():
+    """Apaga os tokens revogados que já expiraram (banco e arquivo de sincronização)."""
+    now = int(time.time())
+    deleted = db.session.execute(
+        db.delete(RevokedToken).where(RevokedToken.expires_at <= now)
+    ).rowcount
+    db.session.commit()
+    pruned = prune_sync_file(current_app.config['BLOCKLIST_SYNC_PATH'], now)
+    print(f"{deleted} tokens expirados removidos do banco, {pruned} do arquivo de sincronização.")
+
+@api.cli.command("build-openapi")
+def build_openapi_command():
+    """Gera o apispec_1.json a partir das docstrings das rotas (passo de build)."""
+    path = build_openapi_spec(current_app)
+    print(f"Especificação OpenAPI gerada em {path}")
+
+#-------------------------------------------------------------------------------------------
+
+def create_app(config=Config):
+    """
+    Cria e configura a aplicação Flask (app factory).
+    Usado pelo 'flask --app app ...' e por servidores WSGI: gunicorn 'app:create_app()'.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    #perfil dos engines (pool, bind de leitura) precisa ser montado antes do SQLAlchemy
+    configure_database(app)
+
+    #inicia as extensões
+    db.init_app(app)
+    install_engine_events(app, db)
+    password_hasher.init_app(app)
+    jwt.init_app(app)
+    response_cache.init_app(app)
+    metrics.init_app(app, db)
+    #controle de admissão antes das rotas: requisições recusadas não chegam ao banco nem ao bcrypt
+    admission.init_app(app)
+    recipe_batcher.init_app(app, _insert_recipe_rows)
+    token_blocklist.init_app(app, _load_revoked_tokens, _lookup_revoked_token)
+    similarity_index.init_app(app)
+
+    app.register_blueprint(api)
+    #Swagger UI e especificação OpenAPI (pré-computada se apispec_1.json existir)
+    init_openapi(app)
+    return app
 
 # Executa o servidor Flask
 if __name__ == "__main__":
+    app = create_app()
     # SOLUÇÃO DEFINITIVA: Força a criação das tabelas se elas não existirem
     # no momento de iniciar o servidor, eliminando erros de ambiente (FLASK_APP).
     with app.app_context():
         db.create_all()
+        _ensure_search_index()
         print("Verificação do Banco de Dados concluída (tabelas criadas se ausentes).")
         
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,363 @@
+#benchmark das rotas da API
+"""
+Benchmark reproduzivel das rotas da API.
+
+Popula um banco com usuarios e receitas sinteticos (semente fixa), sobe o
+servidor localmente e dispara requisições concorrentes em cada rota,
+gerando um JSON com vazão e latencias p50/p95/p99 por endpoint. Mede
+tambem o tempo de inicialização (import + create_app) em processos novos.
+
+Exemplos:
+    python benchmark.py --recipes 10000 --output resultado.json
+    python benchmark.py --recipes 1000000 --reuse-db --db /tmp/bench.db
+    python benchmark.py --baseline resultado.json --max-regression 0.10
+    SWAGGER_UI_ENABLED=0 python benchmark.py --startup-only
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_PASSWORD = 'bench-password'
+
+WORDS = (
+    'bolo', 'torta', 'pão', 'molho', 'sopa', 'salada', 'risoto', 'frango',
+    'carne', 'peixe', 'massa', 'creme', 'mousse', 'farofa', 'feijoada', 'moqueca',
+)
+INGREDIENTS = (
+    'ovos', 'farinha de trigo', 'leite', 'açúcar', 'manteiga', 'sal', 'azeite',
+    'cebola', 'alho', 'tomate', 'queijo', 'frango', 'arroz', 'feijão', 'cenoura',
+    'batata', 'limão', 'chocolate', 'creme de leite', 'fermento', 'pimenta',
+    'salsinha', 'coentro', 'leite de coco', 'camarão', 'milho', 'polvilho',
+)
+
+ENDPOINTS = ('list_recipes', 'get_recipe', 'login', 'create_recipe')
+
+
+def _synthetic_recipe(rng, user_count):
+    title = ' '.join(rng.sample(WORDS, 2)).capitalize()
+    ingredients = rng.sample(INGREDIENTS, rng.randint(3, 9))
+    return {
+        'title': title,
+        'description': f'Receita de {title.lower()} gerada para benchmark.',
+        'ingredients': ', '.join(ingredients),
+        'instructions': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))),
+        'user_id': rng.randint(1, user_count),
+    }
+
+
+def seed_database(users, recipes, seed, batch_size):
+    """Cria as tabelas e insere os dados sinteticos no DATABASE_URL atual."""
+    import app as api
+    from sqlalchemy import insert
+
+    rng = random.Random(seed)
+    with api.create_app().app_context():
+        api.db.create_all()
+        # um unico hash reaproveitado: o custo do bcrypt fica no login, não na carga
+        pw_hash = api.password_hasher.generate_password_hash(BENCH_PASSWORD)
+        for start in range(0, users, batch_size):
+            rows = [
+                {'username': f'bench{i}', 'password': pw_hash}
+                for i in range(start, min(start + batch_size, users))
+            ]
+            api.db.session.execute(insert(api.User.__table__), rows)
+            api.db.session.commit()
+
+        for start in range(0, recipes, batch_size):
+            rows = [_synthetic_recipe(rng, users) for _ in range(min(batch_size, recipes - start))]
+            api._insert_recipe_rows(rows)
+            print(f'  {start + len(rows)}/{recipes} receitas', file=sys.stderr, end='\r')
+        print(file=sys.stderr)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env, port):
+    """Sobe o servidor Flask (threaded) em um subprocesso e espera ficar pronto."""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port), '--with-threads'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return process
+        except (urllib.error.URLError, ConnectionError):
+            if process.poll() is not None:
+                raise RuntimeError('o servidor terminou antes de ficar pronto')
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('o servidor não respondeu a tempo')
+
+
+def _request(base_url, method, path, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        req.add_header('Content-Type', 'application/json')
+    if token:
+        req.add_header('Authorization', f'Bearer {token}')
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def _make_requests(name, args, rng, token):
+    """Gera a lista (metodo, caminho, corpo, token) de um endpoint, de forma deterministica."""
+    total = args.requests + args.warmup
+    if name == 'list_recipes':
+        return [
+            ('GET', f'/recipes?limit={args.page_size}&after={_cursor(rng.randint(0, args.recipes))}', None, None)
+            for _ in range(total)
+        ]
+    if name == 'get_recipe':
+        return [('GET', f'/recipes/{rng.randint(1, args.recipes)}', None, None) for _ in range(total)]
+    if name == 'login':
+        return [
+            ('POST', '/users/login', {'username': f'bench{rng.randrange(args.users)}', 'password': BENCH_PASSWORD}, None)
+            for _ in range(total)
+        ]
+    if name == 'create_recipe':
+        requests = []
+        for _ in range(total):
+            body = _synthetic_recipe(rng, args.users)
+            del body['user_id']
+            requests.append(('POST', '/recipes', body, token))
+        return requests
+    raise ValueError(name)
+
+
+def _cursor(recipe_id):
+    import base64
+    return base64.urlsafe_b64encode(str(recipe_id).encode()).decode().rstrip('=')
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_endpoint(base_url, name, args, token):
+    rng = random.Random(f'{args.seed}:{name}')
+    requests = _make_requests(name, args, rng, token)
+    warmup, measured = requests[:args.warmup], requests[args.warmup:]
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(item):
+        nonlocal errors
+        method, path, body, auth = item
+        start = time.perf_counter()
+        status, _ = _request(base_url, method, path, body, auth)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda item: _request(base_url, *item), warmup))
+        started = time.perf_counter()
+        list(pool.map(call, measured))
+        duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(measured),
+        'errors': errors,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(measured) / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50': round(_percentile(latencies, 50), 3) if latencies else None,
+            'p95': round(_percentile(latencies, 95), 3) if latencies else None,
+            'p99': round(_percentile(latencies, 99), 3) if latencies else None,
+            'max': round(latencies[-1], 3) if latencies else None,
+        },
+    }
+
+
+STARTUP_SCRIPT = (
+    'import time; start = time.perf_counter(); import app; app.create_app(); '
+    'print(time.perf_counter() - start)'
+)
+
+
+def measure_startup(env, runs):
+    """
+    Mede o tempo de inicialização de um worker: import do app + create_app()
+    em um interpretador novo (como no pre-fork), e o tempo total do processo.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    app_times, process_times = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT],
+            cwd=cwd, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        process_times.append((time.perf_counter() - started) * 1000)
+        app_times.append(float(output.strip().splitlines()[-1]) * 1000)
+    app_times.sort()
+    process_times.sort()
+    return {
+        'runs': runs,
+        'create_app_ms': {
+            'mean': round(sum(app_times) / runs, 3),
+            'p50': round(_percentile(app_times, 50), 3),
+            'min': round(app_times[0], 3),
+        },
+        'process_ms': {
+            'mean': round(sum(process_times) / runs, 3),
+            'p50': round(_percentile(process_times, 50), 3),
+            'min': round(process_times[0], 3),
+        },
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Retorna a lista de regressões (p95 maior ou vazão menor que o limite)."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        old_p95, new_p95 = previous['latency_ms']['p95'], current['latency_ms']['p95']
+        if old_p95 and new_p95 and new_p95 > old_p95 * (1 + max_regression):
+            regressions.append(f'{name}: p95 {old_p95}ms -> {new_p95}ms')
+        old_rps, new_rps = previous['throughput_rps'], current['throughput_rps']
+        if old_rps and new_rps and new_rps < old_rps * (1 - max_regression):
+            regressions.append(f'{name}: vazão {old_rps} -> {new_rps} req/s')
+
+    old_startup = (baseline.get('startup') or {}).get('create_app_ms', {}).get('p50')
+    new_startup = (results.get('startup') or {}).get('create_app_ms', {}).get('p50')
+    if old_startup and new_startup and new_startup > old_startup * (1 + max_regression):
+        regressions.append(f'startup: p50 {old_startup}ms -> {new_startup}ms')
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark das rotas da API de Receitas Gourmet.')
+    parser.add_argument('--users', type=int, default=1000, help='usuarios sinteticos')
+    parser.add_argument('--recipes', type=int, default=10000, help='receitas sinteticas')
+    parser.add_argument('--seed', type=int, default=42, help='semente dos dados e das requisições')
+    parser.add_argument('--db', help='arquivo SQLite do benchmark (padrão: temporario)')
+    parser.add_argument('--reuse-db', action='store_true', help='não popular o banco se ele já existir')
+    parser.add_argument('--seed-batch-size', type=int, default=5000)
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=2000, help='requisições medidas por endpoint')
+    parser.add_argument('--warmup', type=int, default=100, help='requisições de aquecimento por endpoint')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--page-size', type=int, default=50, help='limit usado em GET /recipes')
+    parser.add_argument('--bcrypt-rounds', type=int, default=None, help='BCRYPT_LOG_ROUNDS do servidor')
+    parser.add_argument('--no-cache', action='store_true', help='desliga o cache de respostas do servidor')
+    parser.add_argument('--rate-limits', action='store_true', help='mantem os limites de requisições do servidor (RATE_LIMITS)')
+    parser.add_argument('--startup-runs', type=int, default=5, help='execuções do benchmark de inicialização (0 desliga)')
+    parser.add_argument('--startup-only', action='store_true', help='mede apenas o tempo de inicialização')
+    parser.add_argument('--output', help='arquivo JSON de saida (padrão: stdout)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--max-regression', type=float, default=0.10, help='tolerancia relativa (0.10 = 10%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='recipes-bench-'), 'bench.db')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(db_path)
+    if args.bcrypt_rounds is not None:
+        env['BCRYPT_LOG_ROUNDS'] = str(args.bcrypt_rounds)
+    if args.no_cache:
+        env['RESPONSE_CACHE_ENABLED'] = '0'
+    if not args.rate_limits:
+        # todas as requisições vêm do mesmo IP/usuario: os limites mediriam só os 429
+        env['RATE_LIMIT_ENABLED'] = '0'
+    # o processo atual usa as mesmas variaveis para popular o banco
+    os.environ.update(env)
+
+    results = {
+        'meta': {
+            'users': args.users,
+            'recipes': args.recipes,
+            'seed': args.seed,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency,
+            'page_size': args.page_size,
+            'cache': not args.no_cache,
+            'rate_limits': args.rate_limits,
+            'swagger_ui': env.get('SWAGGER_UI_ENABLED', '1') == '1',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'endpoints': {},
+    }
+
+    if args.startup_runs > 0:
+        print('Medindo inicialização...', file=sys.stderr)
+        results['startup'] = measure_startup(env, args.startup_runs)
+
+    if not args.startup_only:
+        if not (args.reuse_db and os.path.exists(db_path)):
+            print(f'Populando {db_path} ({args.users} usuarios, {args.recipes} receitas)...', file=sys.stderr)
+            seed_database(args.users, args.recipes, args.seed, args.seed_batch_size)
+
+        port = _free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        server = start_server(env, port)
+        try:
+            _, body = _request(base_url, 'POST', '/users/login', {'username': 'bench0', 'password': BENCH_PASSWORD})
+            token = json.loads(body).get('access_token')
+            for name in args.endpoints:
+                print(f'Executando {name}...', file=sys.stderr)
+                results['endpoints'][name] = run_endpoint(base_url, name, args, token)
+        finally:
+            server.terminate()
+            server.wait()
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f'REGRESSÃO {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
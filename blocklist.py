@@ -0,0 +1,215 @@
+#lista de tokens JWT revogados (logout)
+import fcntl
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom em um bytearray. Responde 'com certeza não está' ou
+    'talvez esteja' com taxa de falso positivo ~error_rate para 'capacity' itens.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class TokenBlocklist:
+    """
+    Blocklist dos JWT revogados na frente da tabela persistida:
+
+    - filtro de Bloom em memoria: o caso comum (token não revogado) é
+      respondido sem I/O nenhum;
+    - conjunto exato pequeno (LRU) com as respostas já confirmadas no banco,
+      consultado só quando o Bloom diz 'talvez';
+    - arquivo de sincronização (append-only) para que um logout em um worker
+      chegue aos outros, lido no maximo a cada BLOCKLIST_SYNC_INTERVAL segundos;
+    - reconstrução periodica a partir do banco descartando tokens expirados.
+
+    'load' retorna pares (jti, exp) não expirados e 'lookup(jti)' diz se o
+    jti está revogado; ambos são chamados dentro do contexto da aplicação.
+    """
+
+    def __init__(self):
+        self.capacity = 100000
+        self.error_rate = 0.001
+        self.exact_size = 4096
+        self.sync_path = None
+        self.sync_interval = 1.0
+        self.rebuild_interval = 3600
+        self._load = None
+        self._lookup = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._bloom = None
+        self._exact = OrderedDict()
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self._sync_offset = 0
+        self._sync_inode = None
+
+    def init_app(self, app, load, lookup):
+        self.capacity = app.config.get('BLOCKLIST_BLOOM_CAPACITY', self.capacity)
+        self.error_rate = app.config.get('BLOCKLIST_BLOOM_ERROR_RATE', self.error_rate)
+        self.exact_size = app.config.get('BLOCKLIST_EXACT_SIZE', self.exact_size)
+        self.sync_path = app.config.get('BLOCKLIST_SYNC_PATH', self.sync_path)
+        self.sync_interval = app.config.get('BLOCKLIST_SYNC_INTERVAL', self.sync_interval)
+        self.rebuild_interval = app.config.get('BLOCKLIST_REBUILD_INTERVAL', self.rebuild_interval)
+        self._load = load
+        self._lookup = lookup
+
+    def rebuild(self):
+        """Recria o filtro a partir do banco (só tokens ainda não expirados)."""
+        # posiciona no fim do arquivo antes de ler o banco: o que for escrito
+        # depois disso é lido pelo _sync, o que veio antes já está no banco
+        self._skip_sync_file()
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        for jti, _ in self._load():
+            bloom.add(jti)
+        with self._lock:
+            self._bloom = bloom
+            self._exact.clear()
+            self._next_rebuild = time.monotonic() + self.rebuild_interval
+
+    def revoke(self, jti, exp):
+        """Registra um token revogado (já gravado no banco) e avisa os outros workers."""
+        self._ensure_loaded()
+        with self._lock:
+            self._bloom.add(jti)
+            self._remember(jti, True)
+        if self.sync_path:
+            with _sync_file_lock(self.sync_path):
+                with open(self.sync_path, 'a', encoding='utf-8') as f:
+                    f.write(f'{jti}\t{exp}\n')
+
+    def is_revoked(self, jti):
+        self._ensure_loaded()
+        now = time.monotonic()
+        if now >= self._next_rebuild:
+            # só uma thread reconstroi; as outras seguem com o filtro atual
+            if self._rebuild_lock.acquire(blocking=False):
+                try:
+                    if time.monotonic() >= self._next_rebuild:
+                        self.rebuild()
+                finally:
+                    self._rebuild_lock.release()
+        elif now >= self._next_sync:
+            self._sync()
+
+        if jti not in self._bloom:
+            return False
+        with self._lock:
+            revoked = self._exact.get(jti)
+            if revoked is not None:
+                self._exact.move_to_end(jti)
+                return revoked
+        # 'talvez': confirma no banco (raro: revogado ou falso positivo)
+        revoked = bool(self._lookup(jti))
+        with self._lock:
+            self._remember(jti, revoked)
+        return revoked
+
+    def _ensure_loaded(self):
+        if self._bloom is None:
+            # primeira carga: as outras threads esperam em vez de ler o banco também
+            with self._rebuild_lock:
+                if self._bloom is None:
+                    self.rebuild()
+
+    def _remember(self, jti, revoked):
+        self._exact[jti] = revoked
+        self._exact.move_to_end(jti)
+        while len(self._exact) > self.exact_size:
+            self._exact.popitem(last=False)
+
+    def _skip_sync_file(self):
+        if not self.sync_path:
+            return
+        try:
+            stat = os.stat(self.sync_path)
+        except FileNotFoundError:
+            stat = None
+        with self._lock:
+            self._sync_inode = stat.st_ino if stat else None
+            self._sync_offset = stat.st_size if stat else 0
+            self._next_sync = time.monotonic() + self.sync_interval
+
+    def _sync(self):
+        """Le as revogações novas gravadas por outros workers no arquivo."""
+        self._next_sync = time.monotonic() + self.sync_interval
+        if not self.sync_path:
+            return
+        try:
+            with open(self.sync_path, 'r', encoding='utf-8') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                with self._lock:
+                    # arquivo recriado pelo prune: começa do inicio
+                    if inode != self._sync_inode:
+                        self._sync_inode = inode
+                        self._sync_offset = 0
+                    f.seek(self._sync_offset)
+                    data = f.read()
+                    # ignora uma linha incompleta no final (escrita em andamento)
+                    complete = data[:data.rfind('\n') + 1]
+                    self._sync_offset += len(complete.encode('utf-8'))
+                    now = time.time()
+                    for line in complete.splitlines():
+                        jti, _, exp = line.partition('\t')
+                        if jti and (not exp or float(exp) > now):
+                            self._bloom.add(jti)
+                            self._remember(jti, True)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def _sync_file_lock(path):
+    """
+    Lock exclusivo (flock) entre processos para escrever no arquivo de
+    sincronização. Fica em um arquivo '.lock' ao lado: o prune troca o
+    arquivo por outro (os.replace) e um lock no proprio arquivo deixaria um
+    revoke esperando no arquivo antigo, perdendo a revogação.
+    """
+    fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def prune_sync_file(path, now=None):
+    """Reescreve o arquivo de sincronização só com os tokens ainda não expirados."""
+    if not path or not os.path.exists(path):
+        return 0
+    now = now or time.time()
+    # com o lock nenhum revoke escreve entre a leitura e a troca do arquivo
+    with _sync_file_lock(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.endswith('\n')]
+        kept = [line for line in lines if float(line.rstrip('\n').partition('\t')[2] or 0) > now]
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(tmp_path, path)
+    return len(lines) - len(kept)
@@ -0,0 +1,181 @@
+#cache de respostas
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+
+class CachedResponse:
+    """Corpo serializado de uma resposta com seu ETag forte."""
+
+    __slots__ = ('body', 'etag', 'mimetype', 'expires_at', 'tags')
+
+    def __init__(self, body, mimetype, expires_at, tags):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ResponseCache:
+    """
+    Cache LRU limitado com TTL para respostas de leitura.
+
+    Cada entrada é indexada pela rota + argumentos da query e marcada com
+    tags (ex. 'recipe:3'), que permitem invalidar apenas as entradas
+    afetadas por uma escrita.
+
+    Uma leitura que começou antes de uma invalidação das suas tags não é
+    guardada (geração por tag), para não voltar a servir o corpo antigo.
+
+    O cache e as invalidações são do processo: com varios workers (pre-fork)
+    uma escrita só invalida o cache do worker que a fez, e os outros podem
+    servir a versão antiga até o fim do TTL (RESPONSE_CACHE_TTL).
+    """
+
+    # invalidações recentes lembradas para comparar com leituras em andamento
+    MAX_TRACKED_INVALIDATIONS = 4096
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._generation = 0
+        self._invalidated = OrderedDict()
+        self._invalidated_floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', self.enabled)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self):
+        """Geração atual das invalidações; passe para set() a lida antes de gerar a resposta."""
+        with self._lock:
+            return self._generation
+
+    def set(self, key, body, mimetype, tags, generation=None):
+        """
+        Guarda a resposta. Com 'generation', não guarda se alguma das tags
+        foi invalidada depois dela (a resposta é retornada mesmo assim).
+        """
+        entry = CachedResponse(body, mimetype, time.monotonic() + self.ttl, frozenset(tags))
+        with self._lock:
+            if generation is not None and self._invalidated_since(generation, entry.tags):
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, *tags):
+        """Remove todas as entradas marcadas com qualquer uma das tags."""
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                self._invalidated[tag] = self._generation
+                self._invalidated.move_to_end(tag)
+            while len(self._invalidated) > self.MAX_TRACKED_INVALIDATIONS:
+                _, self._invalidated_floor = self._invalidated.popitem(last=False)
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _invalidated_since(self, generation, tags):
+        # mais antiga que as invalidações lembradas: não dá para provar que está atual
+        if generation < self._invalidated_floor:
+            return True
+        return any(self._invalidated.get(tag, 0) > generation for tag in tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def cached(self, tags):
+        """
+        Decorador para rotas GET. 'tags(kwargs, payload)' recebe os argumentos
+        da rota e o JSON da resposta e retorna as tags da entrada.
+        Responde 304 a um If-None-Match valido sem acessar o banco.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if not self.enabled:
+                    return view(**kwargs)
+
+                key = (request.path, tuple(sorted(request.args.items(multi=True))))
+                entry = self.get(key)
+                if entry is None:
+                    generation = self.generation()
+                    response = current_app.make_response(view(**kwargs))
+                    if response.status_code != 200 or response.is_streamed or not response.is_json:
+                        return response
+                    entry = self.set(
+                        key, response.get_data(), response.mimetype,
+                        tags(kwargs, response.get_json()), generation,
+                    )
+
+                if request.if_none_match.contains(entry.etag):
+                    response = current_app.response_class(status=304)
+                else:
+                    response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+                response.set_etag(entry.etag)
+                return response
+            return wrapper
+        return decorator
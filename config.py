@@ -19,9 +19,118 @@ class Config:
         "swagger_ui_fav_icon_css": "//unpkg.com/swagger-ui-dist@3/favicon-32x32.png"
     }
 
+    #Swagger UI em /apidocs/ (desligar em produção para acelerar o inicio dos workers)
+    SWAGGER_UI_ENABLED = os.environ.get('SWAGGER_UI_ENABLED', '1') == '1'
+    #especificação gerada por 'flask build-openapi' e servida de forma estatica
+    OPENAPI_SPEC_PATH = os.environ.get('OPENAPI_SPEC_PATH', 'apispec_1.json')
+
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'recipes.db')
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    #perfil dos engines: pool de escrita e engine separado (somente leitura) para as rotas GET
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 5))
+    DATABASE_READ_SPLIT = os.environ.get('DATABASE_READ_SPLIT', '1') == '1'
+    #url de uma replica de leitura (padrão: o mesmo banco do DATABASE_URL)
+    DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')
+    DATABASE_READ_POOL_SIZE = int(os.environ.get('DATABASE_READ_POOL_SIZE', 10))
+
+    #PRAGMAs aplicados em cada nova conexão SQLite (ignorados em outros bancos)
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),  # negativo = KiB
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms
+    }
+
+    #paginação da listagem de receitas (GET /recipes)
+    RECIPES_PAGE_SIZE = int(os.environ.get('RECIPES_PAGE_SIZE', 50))
+    RECIPES_MAX_PAGE_SIZE = int(os.environ.get('RECIPES_MAX_PAGE_SIZE', 500))
+    #quantidade de linhas buscadas por vez do cursor no modo streaming
+    RECIPES_STREAM_CHUNK = int(os.environ.get('RECIPES_STREAM_CHUNK', 500))
+
+    #cache de respostas das leituras de receitas (LRU com TTL e ETag)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+
+    #custo do bcrypt; hashes com custo diferente são refeitos no proximo login
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    #pool de processos para o hash de senhas (0 = na propria thread)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    #maximo de hashes em execução/espera antes de responder 503
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+
+    #importação em lote (POST /recipes/bulk e flask import-recipes)
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', 1000))
+    BULK_IMPORT_MAX_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_MAX_BATCH_SIZE', 10000))
+    #maximo de erros por linha retornados em uma importação
+    BULK_IMPORT_MAX_ERRORS = int(os.environ.get('BULK_IMPORT_MAX_ERRORS', 1000))
+    #maximo de operações por requisição no POST /batch
+    BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 100))
+
+    #group commit do POST /recipes: uma thread escritora grava varias receitas por transação
+    WRITE_BATCHING_ENABLED = os.environ.get('WRITE_BATCHING_ENABLED', '0') == '1'
+    WRITE_BATCH_MAX_ROWS = int(os.environ.get('WRITE_BATCH_MAX_ROWS', 100))
+    WRITE_BATCH_MAX_DELAY_MS = float(os.environ.get('WRITE_BATCH_MAX_DELAY_MS', 5))
+    WRITE_BATCH_QUEUE_SIZE = int(os.environ.get('WRITE_BATCH_QUEUE_SIZE', 10000))
+    WRITE_BATCH_TIMEOUT = int(os.environ.get('WRITE_BATCH_TIMEOUT', 30))
+    WRITE_BATCH_RETRY_AFTER = int(os.environ.get('WRITE_BATCH_RETRY_AFTER', 1))
+
+    #instrumentação (/metrics): repetições da mesma consulta que indicam N+1
+    METRICS_N_PLUS_ONE_THRESHOLD = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', 5))
+    #adiciona o cabeçalho Server-Timing (tempo de banco e total) nas respostas
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '0') == '1'
     
-    JWT_SECRET_KEY = 'minha_chave_jwt_secreta'
\ No newline at end of file
+    JWT_SECRET_KEY = 'minha_chave_jwt_secreta'
+
+    #blocklist de JWT revogados: filtro de Bloom em memoria na frente da tabela revoked_tokens
+    BLOCKLIST_BLOOM_CAPACITY = int(os.environ.get('BLOCKLIST_BLOOM_CAPACITY', 100000))
+    BLOCKLIST_BLOOM_ERROR_RATE = float(os.environ.get('BLOCKLIST_BLOOM_ERROR_RATE', 0.001))
+    #respostas já confirmadas no banco mantidas em memoria
+    BLOCKLIST_EXACT_SIZE = int(os.environ.get('BLOCKLIST_EXACT_SIZE', 4096))
+    #arquivo compartilhado entre os workers com as revogações recentes
+    BLOCKLIST_SYNC_PATH = os.environ.get('BLOCKLIST_SYNC_PATH') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'revoked_tokens.log')
+    BLOCKLIST_SYNC_INTERVAL = float(os.environ.get('BLOCKLIST_SYNC_INTERVAL', 1))
+    #intervalo (segundos) para reconstruir o filtro descartando tokens expirados
+    BLOCKLIST_REBUILD_INTERVAL = int(os.environ.get('BLOCKLIST_REBUILD_INTERVAL', 3600))
+
+    #intervalo (segundos) para recarregar do banco o indice de ingredientes de cada
+    #worker, que só vê as proprias escritas (0 = carrega uma vez)
+    INGREDIENT_INDEX_RELOAD_INTERVAL = int(os.environ.get('INGREDIENT_INDEX_RELOAD_INTERVAL', 60))
+
+    #receitas similares (MinHash/LSH): valores por assinatura (4 bytes cada) e bandas do LSH.
+    #mudar SIMILARITY_NUM_PERM exige rodar 'flask build-similarity-index' de novo
+    SIMILARITY_NUM_PERM = int(os.environ.get('SIMILARITY_NUM_PERM', 64))
+    SIMILARITY_BANDS = int(os.environ.get('SIMILARITY_BANDS', 16))
+    #intervalo (segundos) para recarregar do banco o indice de cada worker (0 = carrega uma vez)
+    SIMILARITY_INDEX_RELOAD_INTERVAL = int(os.environ.get('SIMILARITY_INDEX_RELOAD_INTERVAL', 300))
+
+    #controle de admissão: requisições simultaneas por worker (0 desliga); acima disso responde 503
+    ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 64))
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+    #endpoints fora do controle de admissão (monitoramento)
+    ADMISSION_EXEMPT = ('api.metrics_endpoint', 'api.cache_stats')
+
+    #limite de requisições por rota (token bucket), respondendo 429 quando esgotado:
+    #endpoint -> {'ip': (requisições, segundos), 'user': (requisições, segundos)};
+    #'user' usa a identidade do JWT e 'default' vale para as rotas não listadas
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMITS = {
+        'api.login': {'ip': (10, 60)},
+        'api.register': {'ip': (5, 60)},
+        'api.get_recipes': {'ip': (300, 60), 'user': (300, 60)},
+        'api.add_recipe': {'user': (60, 60)},
+        'api.batch_recipes': {'user': (30, 60)},
+        'api.bulk_import_recipes': {'user': (10, 60)},
+        'default': {'ip': (600, 60)},
+    }
+    #arquivo mapeado em memoria com os buckets, compartilhado pelos workers (vazio = só no processo)
+    RATE_LIMIT_STORE_PATH = os.environ.get('RATE_LIMIT_STORE_PATH',
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'rate_limits.bin'))
+    RATE_LIMIT_STORE_SLOTS = int(os.environ.get('RATE_LIMIT_STORE_SLOTS', 65536))
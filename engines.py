@@ -0,0 +1,100 @@
+#perfil dos engines do banco de dados
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# nome do bind usado pelas leituras (rotas GET)
+READ_BIND = 'read'
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def configure_database(app):
+    """
+    Monta as opções dos engines a partir do Config antes de iniciar o
+    Flask-SQLAlchemy: pool do engine de escrita e, se habilitado, um bind
+    'read' separado (mesmo banco ou DATABASE_READ_URL) para as rotas GET.
+    """
+    config = app.config
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+
+    write_options = {
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'pool_pre_ping': True,
+    }
+    write_options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = write_options
+
+    # banco em memoria não pode ser compartilhado entre engines
+    if not config['DATABASE_READ_SPLIT'] or _is_memory_sqlite(url):
+        return
+
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    binds[READ_BIND] = {
+        'url': config['DATABASE_READ_URL'] or config['SQLALCHEMY_DATABASE_URI'],
+        'pool_size': config['DATABASE_READ_POOL_SIZE'],
+        'pool_pre_ping': True,
+    }
+    config['SQLALCHEMY_BINDS'] = binds
+
+
+def _sqlite_connect_listener(pragmas, read_only):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            # journal_mode é persistente no arquivo e só o escritor pode alterar
+            if read_only and name == 'journal_mode':
+                continue
+            cursor.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+    return on_connect
+
+
+def _postgres_read_only_listener(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY')
+    cursor.close()
+    dbapi_connection.commit()
+
+
+def install_engine_events(app, db):
+    """
+    Registra os eventos 'connect' que aplicam o perfil em cada nova conexão:
+    PRAGMAs no SQLite (WAL, synchronous, mmap, cache, busy_timeout) e
+    conexões somente leitura no bind 'read' (SQLite e Postgres).
+    """
+    pragmas = app.config['SQLITE_PRAGMAS']
+    with app.app_context():
+        for key, engine in db.engines.items():
+            read_only = key == READ_BIND
+            backend = engine.url.get_backend_name()
+            if backend == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_connect_listener(pragmas, read_only))
+            elif backend == 'postgresql' and read_only:
+                event.listen(engine, 'connect', _postgres_read_only_listener)
+
+
+class RoutingSession(Session):
+    """
+    Sessão que envia as consultas das rotas GET para o engine de leitura.
+    Escritas (flush e comandos DML) continuam no engine principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not getattr(clause, 'is_dml', False)
+            and READ_BIND in self._db.engines
+            and has_request_context()
+            and request.method in READ_METHODS
+        ):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
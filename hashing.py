@@ -0,0 +1,119 @@
+#hash de senhas fora da thread da requisição
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+# o bcrypt só considera os primeiros 72 bytes da senha
+BCRYPT_MAX_BYTES = 72
+
+
+class HasherBusy(Exception):
+    """Levantada quando a fila do pool de hash está cheia."""
+
+    def __init__(self, retry_after):
+        super().__init__('pool de hash de senhas saturado')
+        self.retry_after = retry_after
+
+
+def _hash_password(password, rounds):
+    salt = bcrypt.gensalt(rounds)
+    return bcrypt.hashpw(password.encode('utf-8')[:BCRYPT_MAX_BYTES], salt).decode('utf-8')
+
+
+def _check_password(pw_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8')[:BCRYPT_MAX_BYTES], pw_hash.encode('utf-8'))
+    except ValueError:
+        # hash armazenado invalido
+        return False
+
+
+def hash_rounds(pw_hash):
+    """Extrai o fator de custo de um hash bcrypt ('$2b$12$...' -> 12)."""
+    try:
+        return int(pw_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    Executa o bcrypt em um pool de processos de tamanho fixo com limite de
+    tarefas pendentes. Quando o limite é atingido levanta HasherBusy em vez
+    de enfileirar, para a API responder 503 rapidamente.
+
+    Com PASSWORD_HASH_WORKERS = 0 o hash é feito na propria thread.
+    """
+
+    def __init__(self):
+        self.rounds = 12
+        self.workers = 2
+        self.max_pending = 16
+        self.timeout = 10
+        self.retry_after = 1
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = None
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', self.retry_after)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _get_pool(self):
+        # criado no primeiro uso para que cada worker (pre-fork) tenha o seu
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy(self.retry_after)
+        pool = self._get_pool()
+        try:
+            future = pool.submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_pool(pool)
+            raise HasherBusy(self.retry_after)
+        # o slot só é devolvido quando a tarefa termina, mesmo apos um timeout:
+        # assim a fila do pool nunca passa de PASSWORD_HASH_MAX_PENDING
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy(self.retry_after)
+        except BrokenProcessPool:
+            # um processo filho morreu: recria o pool na proxima chamada
+            self._reset_pool(pool)
+            raise HasherBusy(self.retry_after)
+
+    def _reset_pool(self, pool):
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def generate_password_hash(self, password):
+        return self._run(_hash_password, password, self.rounds)
+
+    def check_password_hash(self, pw_hash, password):
+        return self._run(_check_password, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True se o hash foi gerado com um fator de custo diferente do configurado."""
+        return hash_rounds(pw_hash) != self.rounds
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
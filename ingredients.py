@@ -0,0 +1,232 @@
+#ingredientes
+import heapq
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from reloadable import ReloadableIndex
+
+# palavras de quantidade/medida removidas do inicio de cada ingrediente
+# ("2 xícaras de farinha" -> "farinha")
+UNIT_WORDS = {
+    'g', 'kg', 'mg', 'ml', 'l', 'lt', 'litro', 'litros', 'grama', 'gramas',
+    'quilo', 'quilos', 'xicara', 'xicaras', 'colher', 'colheres', 'sopa', 'cha',
+    'cafe', 'sobremesa', 'copo', 'copos', 'lata', 'latas', 'pitada', 'pitadas',
+    'dente', 'dentes', 'unidade', 'unidades', 'fatia', 'fatias', 'pacote',
+    'pacotes', 'caixa', 'caixas', 'maco', 'macos', 'ramo', 'ramos', 'a', 'gosto',
+    'de', 'da', 'do', 'das', 'dos', 'e', 'meia', 'meio', 'um', 'uma', 'cup',
+    'cups', 'tbsp', 'tsp', 'oz', 'lb',
+}
+
+_SEPARATORS = re.compile(r'[,;\n]+')
+_QUANTITY = re.compile(r'^[\d\s/.,½¼¾-]+')
+
+
+def strip_accents(value):
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', value) if not unicodedata.combining(c)
+    )
+
+
+def normalize_ingredient(raw):
+    """
+    Normaliza um ingrediente: minusculas, sem acentos, sem quantidade e
+    sem unidade de medida. Retorna None se nada sobrar.
+    """
+    value = strip_accents(raw).lower().strip()
+    value = _QUANTITY.sub('', value)
+    words = re.findall(r'[a-z]+', value)
+    while words and words[0] in UNIT_WORDS:
+        words.pop(0)
+    name = ' '.join(words)
+    return name or None
+
+
+def parse_ingredients(text):
+    """Quebra o texto livre de ingredientes em um conjunto de nomes normalizados."""
+    names = set()
+    for part in _SEPARATORS.split(text or ''):
+        name = normalize_ingredient(part)
+        if name:
+            names.add(name)
+    return names
+
+
+class IngredientIndex(ReloadableIndex):
+    """
+    Indice invertido em memoria, guardado em arrays:
+
+    - cada ingrediente tem os ids das receitas que o usam em um array('I'),
+      agrupados pelo numero de ingredientes da receita e ordenados por id
+      dentro de cada grupo (4 bytes por ingrediente de receita);
+    - os ingredientes de cada receita ficam em arrays contiguos (ids das
+      receitas ordenados, deslocamentos e ids dos nomes), para missing_for.
+
+    Como a cobertura de uma receita nunca passa do numero de ingredientes
+    informados, as receitas com menos ingredientes são as que podem faltar
+    menos: query() percorre os grupos do menor para o maior e para assim
+    que nenhum grupo seguinte consegue entrar entre as 'limit' primeiras.
+
+    Receitas gravadas depois da carga ficam em dicionarios (poucas) e as
+    gravadas ou apagadas deixam de valer na carga, até a proxima recarga
+    (refresh), que também traz as escritas feitas por outros workers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._swap(self._build(()))
+
+    def _build(self, pairs):
+        """Monta o indice a partir de pares (recipe_id, nome) ordenados por recipe_id."""
+        names = {}
+        groups = {}
+        recipe_ids = array('I')
+        offsets = array('I', [0])
+        recipe_names = array('I')
+
+        def flush(recipe_id, name_ids):
+            recipe_ids.append(recipe_id)
+            recipe_names.extend(sorted(name_ids))
+            offsets.append(len(recipe_names))
+            size = len(name_ids)
+            for name_id in name_ids:
+                group = groups.get((name_id, size))
+                if group is None:
+                    group = groups[(name_id, size)] = array('I')
+                group.append(recipe_id)
+
+        current, name_ids = None, set()
+        for recipe_id, name in pairs:
+            if recipe_id != current:
+                if current is not None:
+                    if recipe_id < current:
+                        raise ValueError('os pares devem vir ordenados por recipe_id')
+                    flush(current, name_ids)
+                current, name_ids = recipe_id, set()
+            name_id = names.get(name)
+            if name_id is None:
+                name_id = names[name] = len(names)
+            name_ids.add(name_id)
+        if current is not None:
+            flush(current, name_ids)
+
+        postings = {}
+        for (name_id, size) in sorted(groups):
+            ids, sizes = postings.setdefault(name_id, (array('I'), {}))
+            start = len(ids)
+            ids.extend(groups.pop((name_id, size)))
+            sizes[size] = (start, len(ids))
+        return names, postings, recipe_ids, offsets, recipe_names
+
+    def _swap(self, state):
+        self._names, self._postings, self._recipe_ids, self._offsets, self._recipe_names = state
+        self._name_list = sorted(self._names, key=self._names.__getitem__)
+        # escritas depois da carga: recipe_id -> nomes e nome -> ids
+        self._recent = {}
+        self._recent_postings = {}
+        # receitas da carga que foram gravadas de novo ou apagadas
+        self._overridden = set()
+
+    def _apply(self, op):
+        recipe_id = op[1]
+        for name in self._recent.pop(recipe_id, ()):
+            posting = self._recent_postings[name]
+            posting.discard(recipe_id)
+            if not posting:
+                del self._recent_postings[name]
+        self._overridden.add(recipe_id)
+        if op[0] == 'set' and op[2]:
+            self._recent[recipe_id] = op[2]
+            for name in op[2]:
+                self._recent_postings.setdefault(name, set()).add(recipe_id)
+
+    def set_recipe(self, recipe_id, names):
+        """Insere ou substitui os ingredientes de uma receita."""
+        with self._lock:
+            self._write(('set', recipe_id, frozenset(names)))
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            self._write(('remove', recipe_id))
+
+    def _names_of(self, recipe_id):
+        names = self._recent.get(recipe_id)
+        if names is not None or recipe_id in self._overridden:
+            return names or frozenset()
+        i = bisect_left(self._recipe_ids, recipe_id)
+        if i == len(self._recipe_ids) or self._recipe_ids[i] != recipe_id:
+            return frozenset()
+        return frozenset(
+            self._name_list[name_id]
+            for name_id in self._recipe_names[self._offsets[i]:self._offsets[i + 1]]
+        )
+
+    def query(self, have, limit=20, max_missing=None):
+        """
+        Retorna [(recipe_id, cobertura, faltando), ...] das receitas que usam
+        pelo menos um dos ingredientes informados, ordenadas por menos
+        ingredientes faltando e depois por maior cobertura.
+        """
+        have = set(have)
+        if limit <= 0:
+            return []
+        with self._lock:
+            found = self._query_loaded(have, limit, max_missing)
+            coverage = Counter()
+            for name in have:
+                coverage.update(self._recent_postings.get(name, ()))
+            for recipe_id, covered in coverage.items():
+                missing = len(self._recent[recipe_id]) - covered
+                if max_missing is None or missing <= max_missing:
+                    found.append((missing, -covered, recipe_id))
+        return [
+            (recipe_id, -covered, missing)
+            for missing, covered, recipe_id in heapq.nsmallest(limit, found)
+        ]
+
+    def _query_loaded(self, have, limit, max_missing):
+        # candidatos da carga como (faltando, -cobertura, recipe_id); com self._lock
+        postings = [self._postings[self._names[name]] for name in have if name in self._names]
+        best = len(postings)
+        found = []
+        for size in sorted({size for _, sizes in postings for size in sizes}):
+            # neste grupo e nos seguintes faltam pelo menos size - best
+            if max_missing is not None and size - best > max_missing:
+                break
+            if len(found) == limit and size - best > found[-1][0]:
+                break
+            ranges = [ids[slice(*sizes[size])] for ids, sizes in postings if size in sizes]
+            ranges.sort(key=len)
+            largest = ranges.pop()
+            coverage = Counter()
+            for ids in ranges:
+                coverage.update(ids)
+            for recipe_id in coverage:
+                i = bisect_left(largest, recipe_id)
+                if i < len(largest) and largest[i] == recipe_id:
+                    coverage[recipe_id] += 1
+            level = [
+                (size - covered, -covered, recipe_id)
+                for recipe_id, covered in coverage.items()
+                if recipe_id not in self._overridden
+            ]
+            # as receitas só do maior array cobrem 1 ingrediente (o pior caso
+            # do grupo) e empatam entre si: bastam as 'limit' de menor id
+            taken = 0
+            for recipe_id in largest:
+                if taken == limit:
+                    break
+                if recipe_id not in coverage and recipe_id not in self._overridden:
+                    level.append((size - 1, -1, recipe_id))
+                    taken += 1
+            if max_missing is not None:
+                level = [item for item in level if item[0] <= max_missing]
+            found = heapq.nsmallest(limit, found + level)
+        return found
+
+    def missing_for(self, recipe_id, have):
+        """Lista os ingredientes da receita que não estão em 'have'."""
+        with self._lock:
+            return sorted(self._names_of(recipe_id) - set(have))
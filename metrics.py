@@ -0,0 +1,180 @@
+#instrumentação por requisição e endpoint /metrics
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus, separado por labels."""
+
+    def __init__(self, name, documentation, buckets, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labelnames = labelnames
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            base = _format_labels(self.labelnames, labels)
+            prefix = base + ',' if base else ''
+            suffix = f'{{{base}}}' if base else ''
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{suffix} {total}')
+            lines.append(f'{self.name}_count{suffix} {count}')
+        return lines
+
+
+class CounterMetric:
+    """Contador monotonicamente crescente no formato do Prometheus."""
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = Counter()
+
+    def inc(self, labels, amount=1):
+        self._values[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{{{_format_labels(self.labelnames, labels)}}} {value}')
+        return lines
+
+
+def _format_labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+class Metrics:
+    """
+    Coleta, por endpoint, a latencia das requisições, o numero de consultas
+    SQL e o tempo gasto no banco, e sinaliza padrões N+1 (a mesma consulta
+    repetida muitas vezes na mesma requisição). Tudo é exposto no formato
+    texto do Prometheus. Os valores são por processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Latencia das requisições por endpoint.',
+            LATENCY_BUCKETS, ('endpoint', 'method'),
+        )
+        self.requests_total = CounterMetric(
+            'http_requests_total', 'Total de requisições por endpoint e status.',
+            ('endpoint', 'method', 'status'),
+        )
+        self.db_queries = Histogram(
+            'db_queries_per_request', 'Consultas SQL executadas por requisição.',
+            QUERY_COUNT_BUCKETS, ('endpoint',),
+        )
+        self.db_time = Histogram(
+            'db_time_per_request_seconds', 'Tempo gasto no banco por requisição.',
+            LATENCY_BUCKETS, ('endpoint',),
+        )
+        self.n_plus_one = CounterMetric(
+            'db_n_plus_one_total', 'Requisições em que a mesma consulta se repetiu acima do limite.',
+            ('endpoint',),
+        )
+        self._collectors = []
+        self.n_plus_one_threshold = 5
+        self.server_timing = False
+
+    def init_app(self, app, db):
+        self.n_plus_one_threshold = app.config.get('METRICS_N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold)
+        self.server_timing = app.config.get('METRICS_SERVER_TIMING', self.server_timing)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def register_collector(self, collector):
+        """Registra uma função que retorna linhas extras no formato do Prometheus."""
+        self._collectors.append(collector)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_db_time = 0.0
+        g.metrics_statements = Counter()
+
+    def _after_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        statements = g.metrics_statements
+        query_count = sum(statements.values())
+        endpoint = request.endpoint or 'unknown'
+
+        repeated = max(statements.values(), default=0)
+        with self._lock:
+            self.request_latency.observe((endpoint, request.method), elapsed)
+            self.requests_total.inc((endpoint, request.method, response.status_code))
+            self.db_queries.observe((endpoint,), query_count)
+            self.db_time.observe((endpoint,), g.metrics_db_time)
+            if repeated > self.n_plus_one_threshold:
+                self.n_plus_one.inc((endpoint,))
+        if repeated > self.n_plus_one_threshold:
+            statement = statements.most_common(1)[0][0]
+            logger.warning('Possivel N+1 em %s: consulta repetida %d vezes: %s', endpoint, repeated, statement)
+
+        if self.server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={g.metrics_db_time * 1000:.2f};desc="{query_count} queries", '
+                f'app;dur={elapsed * 1000:.2f}',
+            )
+        return response
+
+    # o inicio fica no contexto de execução da consulta: se ela falhar o
+    # after_cursor_execute não roda e nada sobra na conexão do pool
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_query_start', None)
+        if started is None:
+            return
+        if has_request_context() and 'metrics_statements' in g:
+            g.metrics_db_time += time.perf_counter() - started
+            g.metrics_statements[statement] += 1
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.request_latency, self.requests_total, self.db_queries,
+                           self.db_time, self.n_plus_one):
+                lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,52 @@
+#especificação OpenAPI pré-computada e Swagger UI
+import json
+import os
+
+from flask import Response
+
+SPEC_ENDPOINT = 'apispec_1'
+
+
+def _spec_path(app):
+    path = app.config['OPENAPI_SPEC_PATH']
+    return path if os.path.isabs(path) else os.path.join(app.root_path, path)
+
+
+def _init_swagger(app):
+    # importado só aqui: o flasgger (jsonschema, yaml, mistune) pesa na inicialização
+    from flasgger import Swagger
+    return Swagger(app)
+
+
+def init_openapi(app):
+    """
+    Se existir o arquivo gerado por 'flask build-openapi', a especificação é
+    servida direto de um buffer em memoria, sem ler as docstrings das rotas.
+    A Swagger UI só é carregada com SWAGGER_UI_ENABLED (desligar em produção).
+    """
+    spec = None
+    path = _spec_path(app)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            spec = f.read()
+
+    def serve_spec():
+        return Response(spec, mimetype='application/json')
+
+    if app.config['SWAGGER_UI_ENABLED']:
+        _init_swagger(app)
+        if spec is not None:
+            # a UI continua apontando para /apispec_1.json, agora estatico
+            app.view_functions[f'flasgger.{SPEC_ENDPOINT}'] = serve_spec
+    elif spec is not None:
+        app.add_url_rule(f'/{SPEC_ENDPOINT}.json', SPEC_ENDPOINT, serve_spec)
+
+
+def build_openapi_spec(app):
+    """Gera a especificação a partir das docstrings e grava em OPENAPI_SPEC_PATH."""
+    swagger = getattr(app, 'swag', None) or _init_swagger(app)
+    spec = swagger.get_apispecs(SPEC_ENDPOINT)
+    path = _spec_path(app)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return path
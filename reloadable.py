@@ -0,0 +1,96 @@
+#indices em memoria recarregados do banco em uma thread de fundo
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadableIndex:
+    """
+    Base dos indices em memoria carregados do banco (ingredientes, similares).
+
+    As escritas de um worker só chegam ao indice dele; refresh() recarrega o
+    indice do banco periodicamente para trazer as dos outros. A primeira
+    carga roda na thread da requisição (as outras esperam por ela); as
+    seguintes rodam em uma thread de fundo e o indice novo só substitui o
+    atual quando fica pronto, então nenhuma requisição espera a recarga.
+    As escritas feitas durante a recarga são guardadas e reaplicadas sobre
+    o indice novo.
+
+    As subclasses implementam _build(pairs) (monta o estado, fora do lock),
+    _swap(state) e _apply(op), e registram cada escrita com _write(op)
+    segurando self._lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._pending = None
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    def refresh(self, load_pairs, interval, app):
+        """
+        Carrega o indice com load_pairs() se ainda não foi carregado; depois,
+        quando a carga tem mais de 'interval' segundos (0 = nunca recarrega),
+        dispara a recarga em background (no contexto de 'app') e retorna na hora.
+        """
+        if not self.loaded:
+            with self._reload_lock:
+                if not self.loaded:
+                    self._reload(load_pairs)
+            return
+        if not interval or time.monotonic() - self.loaded_at < interval:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            threading.Thread(
+                target=self._reload_in_background,
+                args=(load_pairs, app),
+                name=f'{type(self).__name__}-reload',
+                daemon=True,
+            ).start()
+        except Exception:
+            self._reload_lock.release()
+            raise
+
+    def _reload_in_background(self, load_pairs, app):
+        try:
+            with app.app_context():
+                self._reload(load_pairs)
+        except Exception:
+            # segue com o indice atual e tenta de novo no proximo intervalo
+            logger.exception('falha ao recarregar %s', type(self).__name__)
+            self.loaded_at = time.monotonic()
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self, load_pairs):
+        # as escritas passam a ser guardadas antes da leitura do banco começar
+        with self._lock:
+            self._pending = []
+        try:
+            self.load(load_pairs())
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def load(self, pairs):
+        """Carrega o indice a partir dos pares lidos do banco."""
+        state = self._build(pairs)
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._swap(state)
+            for op in pending or ():
+                self._apply(op)
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+
+    def _write(self, op):
+        # com self._lock; antes da primeira carga não há o que atualizar
+        if self._pending is not None:
+            self._pending.append(op)
+        if self.loaded:
+            self._apply(op)
@@ -0,0 +1,225 @@
+#receitas similares: assinaturas MinHash + indice LSH
+import hashlib
+import random
+import re
+from array import array
+from bisect import bisect_left
+
+from ingredients import UNIT_WORDS, parse_ingredients, strip_accents
+from reloadable import ReloadableIndex
+
+# primo de Mersenne usado nas permutações (a*x + b) mod P
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = 0xFFFFFFFF
+# semente fixa: as assinaturas gravadas no banco precisam ser iguais em todos os processos
+PERMUTATION_SEED = 1729
+
+
+def recipe_tokens(title, ingredients):
+    """Conjunto de tokens da receita: ingredientes normalizados + palavras do titulo."""
+    tokens = parse_ingredients(ingredients)
+    for word in re.findall(r'[a-z]+', strip_accents(title or '').lower()):
+        if len(word) > 2 and word not in UNIT_WORDS:
+            tokens.add(word)
+    return tokens
+
+
+class MinHasher:
+    """Gera assinaturas MinHash de 'num_perm' inteiros de 32 bits (array('I'))."""
+
+    def __init__(self, num_perm):
+        self.num_perm = num_perm
+        rng = random.Random(PERMUTATION_SEED)
+        self._coefs = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, tokens):
+        hashes = [
+            int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+            for token in tokens
+        ]
+        if not hashes:
+            return array('I', [MAX_HASH] * self.num_perm)
+        return array('I', (
+            min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH
+            for a, b in self._coefs
+        ))
+
+
+class SimilarityIndex(ReloadableIndex):
+    """
+    Indice LSH em memoria, guardado em arrays:
+
+    - assinaturas em um unico array('I') contiguo (num_perm * 4 bytes por receita);
+    - para cada banda de 'rows' valores, as chaves de bucket (hash de 64 bits)
+      em um array('q') ordenado, alinhado com um array('I') de ids: 12 bytes
+      por banda e receita, consultados com bisect.
+
+    Receitas gravadas depois da carga ficam em buckets em dicionario (poucas)
+    até a proxima recarga (refresh, em background), que também traz as
+    escritas feitas por outros workers. Receitas que caem no mesmo bucket em
+    alguma banda são candidatas; a similaridade (Jaccard estimado) é a
+    fração de valores iguais nas assinaturas.
+    """
+
+    def __init__(self, num_perm=64, bands=16):
+        super().__init__()
+        self.configure(num_perm, bands)
+
+    def init_app(self, app):
+        self.configure(
+            app.config.get('SIMILARITY_NUM_PERM', self.num_perm),
+            app.config.get('SIMILARITY_BANDS', self.bands),
+        )
+
+    def configure(self, num_perm, bands):
+        if num_perm % bands:
+            raise ValueError('num_perm deve ser multiplo de bands')
+        self.hasher = MinHasher(num_perm)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        with self._lock:
+            self._swap(self._build(()))
+            self.loaded = False
+            self.loaded_at = 0.0
+
+    def signature(self, title, ingredients):
+        return self.hasher.signature(recipe_tokens(title, ingredients))
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash(signature[i * rows:(i + 1) * rows].tobytes()) for i in range(self.bands)]
+
+    def _build(self, pairs):
+        """Monta o indice a partir de pares (recipe_id, bytes da assinatura)."""
+        ids = array('I')
+        signatures = array('I')
+        for recipe_id, data in pairs:
+            signature = array('I')
+            signature.frombytes(data)
+            if len(signature) == self.num_perm:
+                ids.append(recipe_id)
+                signatures.extend(signature)
+        n = self.num_perm
+        if any(ids[i] >= ids[i + 1] for i in range(len(ids) - 1)):
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            ids = array('I', (ids[i] for i in order))
+            signatures = array('I', (
+                value for i in order for value in signatures[i * n:(i + 1) * n]
+            ))
+        band_keys, band_ids = [], []
+        rows = self.rows
+        for band in range(self.bands):
+            keys = [
+                hash(signatures[slot * n + band * rows:slot * n + (band + 1) * rows].tobytes())
+                for slot in range(len(ids))
+            ]
+            order = sorted(range(len(ids)), key=keys.__getitem__)
+            band_keys.append(array('q', (keys[i] for i in order)))
+            band_ids.append(array('I', (ids[i] for i in order)))
+        return ids, signatures, band_keys, band_ids
+
+    def _swap(self, state):
+        self._ids, self._signatures, self._base_keys, self._base_ids = state
+        # escritas depois da carga: recipe_id -> slot e buckets por banda
+        self._recent_slots = {}
+        self._recent_buckets = [{} for _ in range(self.bands)]
+        # receitas da carga que foram apagadas
+        self._removed = set()
+
+    def _slot(self, recipe_id):
+        slot = self._recent_slots.get(recipe_id)
+        if slot is not None:
+            return slot
+        i = bisect_left(self._ids, recipe_id)
+        if i < len(self._ids) and self._ids[i] == recipe_id and recipe_id not in self._removed:
+            return i
+        return None
+
+    def _signature_at(self, slot):
+        start = slot * self.num_perm
+        return self._signatures[start:start + self.num_perm]
+
+    def set_recipe(self, recipe_id, signature):
+        with self._lock:
+            self._write(('set', recipe_id, signature))
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            self._write(('remove', recipe_id))
+
+    def _apply(self, op):
+        if op[0] == 'set':
+            self._set(op[1], op[2])
+        else:
+            self._remove(op[1])
+
+    def _set(self, recipe_id, signature):
+        slot = self._slot(recipe_id)
+        if slot is not None:
+            self._discard_recent_keys(recipe_id, self._signature_at(slot))
+        else:
+            i = bisect_left(self._ids, recipe_id)
+            if i < len(self._ids) and self._ids[i] == recipe_id:
+                # apagada e gravada de novo: reaproveita o slot da carga
+                self._removed.discard(recipe_id)
+                slot = i
+            else:
+                slot = len(self._signatures) // self.num_perm
+                self._signatures.extend(signature)
+                self._recent_slots[recipe_id] = slot
+        start = slot * self.num_perm
+        self._signatures[start:start + self.num_perm] = signature
+        # as chaves antigas da carga continuam no array ordenado: no maximo
+        # viram candidatos a mais, que a comparação das assinaturas descarta
+        for bucket, key in zip(self._recent_buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(recipe_id)
+
+    def _remove(self, recipe_id):
+        slot = self._slot(recipe_id)
+        if slot is None:
+            return
+        self._discard_recent_keys(recipe_id, self._signature_at(slot))
+        if self._recent_slots.pop(recipe_id, None) is None:
+            self._removed.add(recipe_id)
+
+    def _discard_recent_keys(self, recipe_id, signature):
+        for bucket, key in zip(self._recent_buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members and recipe_id in members:
+                members.remove(recipe_id)
+                if not members:
+                    del bucket[key]
+
+    def get(self, recipe_id):
+        with self._lock:
+            slot = self._slot(recipe_id)
+            return self._signature_at(slot) if slot is not None else None
+
+    def query(self, signature, k=10, exclude=None):
+        """Retorna [(recipe_id, similaridade), ...] das k receitas mais parecidas."""
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                keys, ids = self._base_keys[band], self._base_ids[band]
+                i = bisect_left(keys, key)
+                while i < len(keys) and keys[i] == key:
+                    candidates.add(ids[i])
+                    i += 1
+                candidates.update(self._recent_buckets[band].get(key, ()))
+            candidates.discard(exclude)
+
+            results = []
+            n = self.num_perm
+            for recipe_id in candidates:
+                slot = self._slot(recipe_id)
+                if slot is None:
+                    continue
+                other = self._signature_at(slot)
+                equal = sum(1 for x, y in zip(signature, other) if x == y)
+                results.append((recipe_id, equal / n))
+        results.sort(key=lambda r: (-r[1], r[0]))
+        return results[:k]
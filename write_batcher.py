@@ -0,0 +1,162 @@
+#agrupamento de escritas (group commit)
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class WriteQueueFull(Exception):
+    """Levantada quando a fila de escritas está cheia."""
+
+    def __init__(self, retry_after):
+        super().__init__('fila de escritas cheia')
+        self.retry_after = retry_after
+
+
+class WriteTimeout(Exception):
+    """
+    Levantada quando o commit não terminou em WRITE_BATCH_TIMEOUT segundos.
+    Se a linha ainda estava na fila ela é cancelada (applied=False); se já
+    estava sendo gravada o commit pode ter acontecido (applied=None).
+    """
+
+    def __init__(self, retry_after, applied):
+        super().__init__('tempo esgotado esperando a gravação')
+        self.retry_after = retry_after
+        self.applied = applied
+
+
+class WriteBatcher:
+    """
+    Enfileira inserções concorrentes para uma unica thread escritora, que
+    grava até WRITE_BATCH_MAX_ROWS linhas (ou o que chegar em
+    WRITE_BATCH_MAX_DELAY_MS) em uma unica transação. Cada chamada de
+    submit() só retorna depois do commit, com o id da sua linha.
+
+    'flush' recebe a lista de linhas e retorna a lista de ids, e é chamada
+    dentro de um contexto da aplicação.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.max_rows = 100
+        self.max_delay = 0.005
+        self.timeout = 30
+        self.retry_after = 1
+        self.queue_size = 10000
+        self._app = None
+        self._flush = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.batch_size = Histogram(
+            'write_batch_size', 'Linhas gravadas por transação do escritor.', BATCH_SIZE_BUCKETS, (),
+        )
+        self.queue_wait = Histogram(
+            'write_batch_queue_wait_seconds', 'Tempo de espera na fila até o inicio do commit.',
+            QUEUE_WAIT_BUCKETS, (),
+        )
+
+    def init_app(self, app, flush):
+        self.enabled = app.config.get('WRITE_BATCHING_ENABLED', self.enabled)
+        self.max_rows = app.config.get('WRITE_BATCH_MAX_ROWS', self.max_rows)
+        self.max_delay = app.config.get('WRITE_BATCH_MAX_DELAY_MS', self.max_delay * 1000) / 1000
+        self.timeout = app.config.get('WRITE_BATCH_TIMEOUT', self.timeout)
+        self.retry_after = app.config.get('WRITE_BATCH_RETRY_AFTER', self.retry_after)
+        self.queue_size = app.config.get('WRITE_BATCH_QUEUE_SIZE', self.queue_size)
+        self._app = app
+        self._flush = flush
+
+    def _ensure_started(self):
+        # a thread é criada no primeiro uso e recriada apos um fork (pre-fork)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='write-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Enfileira a linha e espera o commit. Retorna o id gerado."""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((row, future, time.perf_counter()))
+        except queue.Full:
+            raise WriteQueueFull(self.retry_after)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # ainda na fila: cancela para a thread escritora não gravar depois
+            raise WriteTimeout(self.retry_after, applied=False if future.cancel() else None)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _call_flush(self, rows):
+        with self._app.app_context():
+            return self._flush(rows)
+
+    def _commit(self, batch):
+        # descarta as linhas canceladas por timeout; as demais não podem mais ser canceladas
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        with self._metrics_lock:
+            self.batch_size.observe((), len(batch))
+            for _, _, enqueued_at in batch:
+                self.queue_wait.observe((), started - enqueued_at)
+
+        try:
+            ids = self._call_flush([row for row, _, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # isola a linha com problema: as outras continuam sendo gravadas
+            for item in batch:
+                self._commit_one(item)
+            return
+        for (_, future, _), recipe_id in zip(batch, ids):
+            future.set_result(recipe_id)
+
+    def _commit_one(self, item):
+        row, future, _ = item
+        try:
+            future.set_result(self._call_flush([row])[0])
+        except Exception as e:
+            future.set_exception(e)
+
+    def render_metrics(self):
+        """Linhas no formato do Prometheus para o /metrics."""
+        with self._metrics_lock:
+            lines = self.batch_size.render() + self.queue_wait.render()
+        depth = self._queue.qsize() if self._queue is not None else 0
+        lines += [
+            '# HELP write_batch_queue_depth Linhas aguardando a thread escritora.',
+            '# TYPE write_batch_queue_depth gauge',
+            f'write_batch_queue_depth {depth}',
+        ]
+        return lines